@@ -0,0 +1,176 @@
+import json
+import platform
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+import click
+
+from .generate import Synthetic
+from .stages import STAGES, Measurement, Run, measure
+
+
+@click.command
+@click.option(
+    "-n",
+    "--entries",
+    type=int,
+    multiple=True,
+    default=[1000, 10000, 100000],
+    show_default=True,
+    help="Lexicon sizes to benchmark (repeatable)",
+)
+@click.option(
+    "-s",
+    "--stage",
+    "stages",
+    type=click.Choice(list(STAGES)),
+    multiple=True,
+    default=list(STAGES),
+    help="Stages to run (repeatable, all by default)",
+)
+@click.option("--affix-depth", default=Synthetic.affix_depth, show_default=True)
+@click.option("--scope-depth", default=Synthetic.scope_depth, show_default=True)
+@click.option("--compound-depth", default=Synthetic.compound_depth, show_default=True)
+@click.option("--pages", default=Synthetic.pages, show_default=True)
+@click.option("--rules", default=Synthetic.rules, show_default=True)
+@click.option("--seed", default=Synthetic.seed, show_default=True)
+@click.option("-r", "--repeat", default=3, show_default=True, help="Rounds per stage")
+@click.option("-j", "--jobs", default=1, show_default=True, help="Jobs for compile")
+@click.option(
+    "-l",
+    "--lexurgy",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Lexurgy launcher to use instead of the stub server",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write the results as JSON",
+)
+@click.option(
+    "-c",
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Compare with the JSON results of an earlier run",
+)
+@click.option(
+    "-t",
+    "--threshold",
+    default=1.2,
+    show_default=True,
+    help="Slowdown ratio that counts as a regression",
+)
+def run(
+    entries: tuple[int, ...],
+    stages: tuple[str, ...],
+    affix_depth: int,
+    scope_depth: int,
+    compound_depth: int,
+    pages: int,
+    rules: int,
+    seed: int,
+    repeat: int,
+    jobs: int,
+    lexurgy: Path | None,
+    output: Path | None,
+    compare: Path | None,
+    threshold: float,
+) -> None:
+    synthetic = Synthetic(
+        affix_depth=affix_depth,
+        scope_depth=scope_depth,
+        compound_depth=compound_depth,
+        pages=pages,
+        rules=rules,
+        seed=seed,
+    )
+
+    measurements: list[Measurement] = []
+    for size in entries:
+        with ProcessPoolExecutor(1, get_context("spawn")) as executor:
+            measurements += executor.submit(
+                measure,
+                Run(replace(synthetic, entries=size), repeat, jobs),
+                list(stages),
+                lexurgy,
+            ).result()
+
+        for measurement in measurements[-len(stages) :]:
+            click.echo(
+                f"{measurement.stage:<20} {measurement.entries:>8}"
+                f" {measurement.seconds:>10.4f}s {measurement.items:>8}"
+            )
+
+    results = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "lexurgy": "stub" if lexurgy is None else str(lexurgy),
+        "jobs": jobs,
+        "synthetic": {
+            key: value for key, value in asdict(synthetic).items() if key != "entries"
+        },
+        "measurements": [asdict(measurement) for measurement in measurements],
+    }
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+
+    if compare is not None and regressions(
+        json.loads(compare.read_text()), results, threshold
+    ):
+        sys.exit(1)
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(
+    baseline: dict[str, Any], results: dict[str, Any], threshold: float
+) -> list[tuple[str, int]]:
+    """
+    Prints the ratio of every stage and size found in both runs, and returns the
+    ones slower than `threshold` times the baseline.
+    """
+    before = {
+        (measurement["stage"], measurement["entries"]): measurement["seconds"]
+        for measurement in baseline["measurements"]
+    }
+
+    click.echo(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+
+    slower = []
+    for measurement in results["measurements"]:
+        key = (measurement["stage"], measurement["entries"])
+        if key not in before:
+            continue
+        ratio = measurement["seconds"] / max(before[key], 1e-9)
+        flag = ""
+        if ratio > threshold:
+            slower.append(key)
+            flag = "  REGRESSION"
+        click.echo(
+            f"{key[0]:<20} {key[1]:>8} {before[key]:>10.4f}s"
+            f" {measurement['seconds']:>10.4f}s {ratio:>6.2f}x{flag}"
+        )
+
+    return slower
+
+
+if __name__ == "__main__":
+    run()
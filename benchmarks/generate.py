@@ -0,0 +1,233 @@
+import shlex
+import sys
+from dataclasses import dataclass
+from functools import cached_property
+from importlib.resources import files
+from os.path import relpath
+from pathlib import Path
+from random import Random
+
+from pyconlang import CHANGES_PATH, LEXICON_PATH, SRC_PATH
+from pyconlang.book import LAYOUT_PATH
+from pyconlang.config import Config
+from pyconlang.lexurgy import LEXURGY_PATH
+
+STUB_PATH = Path(__file__).parent / "lexurgy_stub.py"
+SHARED_PATH = SRC_PATH / "shared.md"
+
+CONSONANTS = "ptkmnsl"
+VOWELS = "aiu"
+
+
+@dataclass(frozen=True)
+class SyntheticEntry:
+    name: str
+    scope: int
+    form: str
+
+    @property
+    def word(self) -> str:
+        return f"<{self.name}>"
+
+
+@dataclass(frozen=True)
+class Synthetic:
+    """
+    A generated project: a lexicon of `entries` entries spread over a chain of
+    `scope_depth` scopes below the root, whose derived entries stack `affix_depth`
+    affixes or nest `compound_depth` compounds, and a book of `pages` pages that
+    uses every entry once.
+    """
+
+    entries: int = 1000
+    affix_depth: int = 2
+    scope_depth: int = 2
+    compound_depth: int = 2
+    pages: int = 10
+    rules: int = 8
+    sentence_size: int = 8
+    seed: int = 0
+
+    @cached_property
+    def random(self) -> Random:
+        return Random(self.seed)
+
+    @property
+    def scopes(self) -> list[str]:
+        return [""] + [f"s{depth}" for depth in range(1, self.scope_depth + 1)]
+
+    def changes_for(self, scope: int) -> Path:
+        if scope == 0:
+            return CHANGES_PATH
+        return SRC_PATH / f"{self.scopes[scope]}.lsc"
+
+    def rule_names(self, scope: int) -> list[str]:
+        prefix = f"{self.scopes[scope]}-r" if scope else "r"
+        return [f"{prefix}{i}" for i in range(self.rules)]
+
+    @property
+    def suffixes(self) -> list[str]:
+        return [f"S{i}" for i in range(max(2, 2 * self.affix_depth))]
+
+    @property
+    def prefixes(self) -> list[str]:
+        return [f"P{i}" for i in range(max(2, 2 * self.affix_depth))]
+
+    def proto(self) -> str:
+        return "".join(
+            self.random.choice(CONSONANTS) + self.random.choice(VOWELS)
+            for _syllable in range(self.random.randint(1, 3))
+        )
+
+    def era(self) -> str:
+        if self.random.random() < 0.5:
+            return ""
+        return f"@{self.random.choice(self.rule_names(0))}"
+
+    def joiner(self) -> str:
+        return self.random.choice(["!+", "+!"]) + self.era()
+
+    @cached_property
+    def lexicon(self) -> list[SyntheticEntry]:
+        roots: list[SyntheticEntry] = []
+        lexicon: list[SyntheticEntry] = []
+
+        for i in range(self.entries):
+            kind = i % 4 if roots else 0
+            scope = 0 if kind == 0 else (i // 4) % len(self.scopes)
+
+            if kind == 1 and self.affix_depth > 0:
+                form = self.random.choice(roots).word
+                for depth in range(self.affix_depth):
+                    if depth % 2 == 0:
+                        form = f"{form}.{self.random.choice(self.suffixes)}"
+                    else:
+                        form = f"{self.random.choice(self.prefixes)}.{form}"
+            elif kind == 2 and self.compound_depth > 0:
+                form = self.random.choice(roots).word
+                for depth in range(self.compound_depth):
+                    if depth > 0:
+                        form = f"{{ {form} }}"
+                    form = f"{form} {self.joiner()} {self.random.choice(roots).word}"
+            else:
+                form = f"*{self.proto()}{self.era()}"
+
+            entry = SyntheticEntry(f"w{i}", scope, form)
+            lexicon.append(entry)
+            if kind == 0:
+                roots.append(entry)
+
+        return lexicon
+
+    def lexicon_lines(self) -> list[str]:
+        lexicon = self.lexicon
+        lines = [
+            f"scope %{scope} : %{self.scopes[i]} '{self.changes_for(i + 1)}'"
+            for i, scope in enumerate(self.scopes[1:])
+        ]
+
+        for affix in self.suffixes:
+            lines.append(f"affix .{affix} *{self.proto()}{self.era()} suffix")
+        for affix in self.prefixes:
+            lines.append(f"affix {affix}. *{self.proto()}{self.era()} prefix")
+
+        for entry in lexicon:
+            lines.append(
+                f"entry %{self.scopes[entry.scope]} {entry.word} {entry.form}"
+                f" (n.) word {entry.name}"
+            )
+
+        return lines
+
+    def changes(self, scope: int) -> str:
+        lines = []
+        if scope > 0:
+            lines.append(f'#include "{self.changes_for(scope - 1).name}"')
+            lines.append("")
+
+        for rule in self.rule_names(scope):
+            lines.append(f"{rule}:")
+            lines.append("    unchanged")
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def sentences(self) -> dict[int, list[str]]:
+        """
+        The words of every entry, in sentences grouped by the entry's scope.
+        """
+        words: dict[int, list[str]] = {scope: [] for scope in range(len(self.scopes))}
+        for entry in self.lexicon:
+            words[entry.scope].append(entry.word)
+
+        return {
+            scope: [
+                " ".join(scope_words[i : i + self.sentence_size])
+                for i in range(0, len(scope_words), self.sentence_size)
+            ]
+            for scope, scope_words in words.items()
+        }
+
+    def scoped_sentences(self) -> list[str]:
+        return [
+            f"%{self.scopes[scope]} {sentence}"
+            for scope, sentences in self.sentences().items()
+            for sentence in sentences
+        ]
+
+    def page_paths(self) -> list[Path]:
+        paths = []
+        for page in range(self.pages):
+            scope = self.scopes[page % len(self.scopes)]
+            if scope:
+                paths.append(SRC_PATH / f"p{page}" / f"%{scope}.out.md")
+            else:
+                paths.append(SRC_PATH / f"p{page}.out.md")
+        return paths
+
+    def page_contents(self) -> list[str]:
+        contents = [
+            [f"# Page {page}", "", f"@{{{relpath(SHARED_PATH, path.parent)}}}@", ""]
+            for page, path in enumerate(self.page_paths())
+        ]
+
+        for scope, sentences in self.sentences().items():
+            scope_pages = list(range(scope, self.pages, len(self.scopes)))
+            if not scope_pages:
+                continue
+            for i, sentence in enumerate(sentences):
+                macro = ["r", "ph", "pr"][i % 3]
+                contents[scope_pages[i % len(scope_pages)]] += [
+                    f"{macro}({sentence})",
+                    "",
+                ]
+
+        return ["\n".join(lines) for lines in contents]
+
+    def write(self, lexurgy: Path | None = None) -> None:
+        """
+        Writes the project into the working directory. Without a Lexurgy launcher
+        the project runs the stub server.
+        """
+        Config(name="Synthetic", author="Benchmarks").save()
+
+        SRC_PATH.mkdir(parents=True, exist_ok=True)
+        LEXICON_PATH.write_text("\n".join(self.lexicon_lines()) + "\n")
+        for scope in range(len(self.scopes)):
+            self.changes_for(scope).write_text(self.changes(scope))
+
+        LAYOUT_PATH.write_text(
+            files("pyconlang.assets.template").joinpath("layout.html").read_text()
+        )
+        SHARED_PATH.write_text(f"Shared by every page: r({self.lexicon[0].word})\n")
+        for path, content in zip(self.page_paths(), self.page_contents()):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+
+        if lexurgy is None:
+            command = f"{shlex.quote(sys.executable)} {shlex.quote(str(STUB_PATH))}"
+        else:
+            command = f"sh {shlex.quote(str(lexurgy.absolute()))}"
+
+        LEXURGY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        LEXURGY_PATH.write_text(f'exec {command} "$@"\n')
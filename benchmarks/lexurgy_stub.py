@@ -0,0 +1,35 @@
+"""
+Speaks Lexurgy's server protocol without running any sound changes, so that the
+benchmarks time pyconlang alone. Every word comes back unchanged.
+"""
+import json
+import sys
+from typing import IO
+
+
+def respond(line: str) -> str:
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as error:
+        return json.dumps({"type": "error", "message": str(error), "stackTrace": []})
+
+    return json.dumps(
+        {
+            "type": "changed",
+            "words": request.get("words", []),
+            "intermediates": {},
+            "traceLines": [],
+        }
+    )
+
+
+def serve(stdin: IO[str], stdout: IO[str]) -> None:
+    for line in stdin:
+        if not line.strip():
+            continue
+        stdout.write(f"{respond(line)}\n")
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    serve(sys.stdin, sys.stdout)
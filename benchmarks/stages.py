@@ -0,0 +1,203 @@
+import os
+import shutil
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from pyconlang import LEXICON_PATH
+from pyconlang.book import OUT_PATH, Compiler
+from pyconlang.cache import CACHE_PATH
+from pyconlang.config import file_config
+from pyconlang.domain import DefaultWord, ResolvedForm, Scope
+from pyconlang.evolve import Evolver
+from pyconlang.evolve.arrange import arranger_for
+from pyconlang.evolve.batch import Batcher
+from pyconlang.lexicon import Lexicon
+from pyconlang.lexicon.parser import parse_lexicon
+from pyconlang.parser import parse_sentence
+
+from .generate import Synthetic
+
+
+@dataclass(frozen=True)
+class Measurement:
+    stage: str
+    entries: int
+    seconds: float
+    items: int
+    laps: list[float]
+
+
+@dataclass
+class Stopwatch:
+    laps: list[float] = field(default_factory=list)
+
+    @contextmanager
+    def lap(self) -> Generator[None, None, None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.laps.append(perf_counter() - start)
+
+
+@dataclass(frozen=True)
+class Run:
+    synthetic: Synthetic
+    repeat: int = 3
+    jobs: int = 1
+
+    @cached_property
+    def sentences(self) -> list[tuple[Scope, list[DefaultWord]]]:
+        sentences = []
+        for string in self.synthetic.scoped_sentences():
+            sentence = parse_sentence(string)
+            sentences.append((sentence.scope, sentence.words))
+        return sentences
+
+    def resolved(self, lexicon: Lexicon) -> dict[Scope, list[ResolvedForm]]:
+        per_scope: dict[Scope, list[ResolvedForm]] = {}
+        for scope, words in self.sentences:
+            per_scope.setdefault(scope, [])
+            per_scope[scope].extend(lexicon.resolve(word, scope) for word in words)
+        return per_scope
+
+
+Stage = Callable[[Run, Stopwatch], int]
+
+
+def parse(run: Run, stopwatch: Stopwatch) -> int:
+    lines = LEXICON_PATH.read_text().splitlines()
+    for _round in range(run.repeat):
+        with stopwatch.lap():
+            parsed = list(parse_lexicon(lines))
+    return len(parsed)
+
+
+def resolve(run: Run, stopwatch: Stopwatch) -> int:
+    sentences = run.sentences
+    for _round in range(run.repeat):
+        lexicon = Lexicon.from_path(LEXICON_PATH)
+        with stopwatch.lap():
+            forms = [
+                lexicon.resolve(word, scope)
+                for scope, words in sentences
+                for word in words
+            ]
+    return len(forms)
+
+
+def build(run: Run, stopwatch: Stopwatch) -> int:
+    lexicon = Lexicon.from_path(LEXICON_PATH)
+    per_scope = run.resolved(lexicon)
+    for _round in range(run.repeat):
+        batcher = Batcher()
+        queries = 0
+        with stopwatch.lap():
+            for scope, forms in per_scope.items():
+                arranger = arranger_for(lexicon.changes_for(scope))
+                _mapping, layers = batcher.builder(arranger).build_and_order(
+                    [arranger.rearrange(form) for form in forms]
+                )
+                queries += sum(map(len, layers))
+    return queries
+
+
+def evolve(run: Run, stopwatch: Stopwatch) -> int:
+    lexicon = Lexicon.from_path(LEXICON_PATH)
+    per_scope = run.resolved(lexicon)
+    for _round in range(run.repeat):
+        shutil.rmtree(CACHE_PATH, ignore_errors=True)
+        with Evolver.new() as evolver, stopwatch.lap():
+            for scope, forms in per_scope.items():
+                evolver.evolve(forms, changes=lexicon.changes_for(scope))
+    return sum(map(len, per_scope.values()))
+
+
+def evolve_cached(run: Run, stopwatch: Stopwatch) -> int:
+    lexicon = Lexicon.from_path(LEXICON_PATH)
+    per_scope = run.resolved(lexicon)
+    with Evolver.new() as evolver:
+        for scope, forms in per_scope.items():
+            evolver.evolve(forms, changes=lexicon.changes_for(scope))
+
+        for _round in range(run.repeat):
+            with stopwatch.lap():
+                for scope, forms in per_scope.items():
+                    evolver.evolve(forms, changes=lexicon.changes_for(scope))
+    return sum(map(len, per_scope.values()))
+
+
+def compile_book(run: Run, stopwatch: Stopwatch) -> int:
+    for _round in range(run.repeat):
+        shutil.rmtree(OUT_PATH, ignore_errors=True)
+        shutil.rmtree(CACHE_PATH, ignore_errors=True)
+        with Compiler.new(run.jobs) as compiler, stopwatch.lap():
+            compiler.compile()
+    return run.synthetic.pages
+
+
+def compile_incremental(run: Run, stopwatch: Stopwatch) -> int:
+    page = run.synthetic.page_paths()[0]
+    with Compiler.new(run.jobs) as compiler:
+        compiler.compile()
+        for edit in range(run.repeat):
+            with page.open("a") as file:
+                file.write(f"\nEdit {edit}\n")
+            mtime = page.stat().st_mtime + edit + 1
+            os.utime(page, (mtime, mtime))
+            with stopwatch.lap():
+                compiler.compile()
+    return 1
+
+
+STAGES: dict[str, Stage] = {
+    "parse": parse,
+    "resolve": resolve,
+    "build": build,
+    "evolve": evolve,
+    "evolve-cached": evolve_cached,
+    "compile": compile_book,
+    "compile-incremental": compile_incremental,
+}
+
+
+@contextmanager
+def project(synthetic: Synthetic, lexurgy: Path | None) -> Generator[Path, None, None]:
+    cwd = Path.cwd()
+    with TemporaryDirectory(prefix="pyconlang-bench-") as directory:
+        os.chdir(directory)
+        try:
+            synthetic.write(lexurgy)
+            with file_config():
+                yield Path(directory)
+        finally:
+            os.chdir(cwd)
+
+
+def measure(
+    run: Run, stages: list[str], lexurgy: Path | None = None
+) -> list[Measurement]:
+    """
+    Times the stages on a freshly generated project. Meant to run in its own
+    process, so that no stage benefits from the memoization of an earlier run.
+    """
+    measurements = []
+    with project(run.synthetic, lexurgy):
+        for stage in stages:
+            stopwatch = Stopwatch()
+            items = STAGES[stage](run, stopwatch)
+            measurements.append(
+                Measurement(
+                    stage,
+                    run.synthetic.entries,
+                    min(stopwatch.laps),
+                    items,
+                    stopwatch.laps,
+                )
+            )
+    return measurements
@@ -1,26 +1,48 @@
+import filecmp
 import shutil
 import sys
 import time
 from collections.abc import Generator
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
-from functools import cache, cached_property
+from dataclasses import replace
+from functools import cache
+from multiprocessing import get_context
 from pathlib import Path
 from string import Template
 from threading import Thread
-from typing import Self
+from typing import Any, Self, cast
 
 from markdown import Markdown
+from pyrsercomb import PyrsercombError
 from watchdog.events import FileSystemEvent, PatternMatchingEventHandler
 from watchdog.observers import Observer
 
-from .. import ASSETS_PATH, PYCONLANG_PATH, SRC_GLOB, SRC_PATH
-from ..cache import resolve_any_path
-from ..config import config, config_scope_as
-from ..errors import pass_exception
+from .. import (
+    ASSETS_PATH,
+    CHANGES_GLOB,
+    LEXICON_GLOB,
+    PYCONLANG_PATH,
+    SRC_GLOB,
+    SRC_PATH,
+)
+from ..cache import (
+    AnyPath,
+    PathCachedFunc,
+    cache_registry,
+    file_monitor,
+    path_cached_property,
+    resolve_any_path,
+)
+from ..config import Config, config, config_as, config_scope_as
+from ..domain import ResolvedForm, Scope
+from ..errors import PyconlangError, pass_exception
+from ..lexurgy import lexurgy_processes, split_evenly
+from ..profile import count, profile, profiling, timed, timer
 from ..translate import Translator
 from .any_table_header import AnyTableHeader
 from .block import Boxed
-from .conlang import Conlang
+from .conlang import Conlang, evolve_payloads
 from .multi import MultiExtension
 from .skipline import SkipLine
 from .span_table import SpanTable
@@ -28,19 +50,26 @@ from .unicode import UnicodeEscape
 
 LAYOUT_PATH = SRC_PATH / "layout.html"
 OUT_PATH = PYCONLANG_PATH / "out"
+PAGE_PATHS: list[AnyPath] = [LAYOUT_PATH, LEXICON_GLOB, CHANGES_GLOB]
+
+PageDependencies = PathCachedFunc[[], None]
 
 
 class Compiler:
     conlang: Conlang
+    pages: dict[Path, PageDependencies]
+    jobs: int
 
     @classmethod
     @contextmanager
-    def new(cls) -> Generator[Self, None, None]:
-        with pass_exception(Translator.new()) as translator:
-            yield cls(translator)
+    def new(cls, jobs: int = 1, eager: bool = False) -> Generator[Self, None, None]:
+        with pass_exception(Translator.new(eager)) as translator:
+            yield cls(translator, jobs)
 
-    def __init__(self, translator: Translator) -> None:
+    def __init__(self, translator: Translator, jobs: int = 1) -> None:
         self.conlang = Conlang(translator)
+        self.pages = {}
+        self.jobs = jobs
 
     @cache
     def converter_for(self, path: Path) -> Markdown:
@@ -71,51 +100,211 @@ class Compiler:
                     "base_path": str(path.parent),
                     "syntax_left": r"@\{",
                     "syntax_right": r"\}@",
-                    "content_cache_clean_local": True,
+                    "content_cache_clean_local": False,
                     "recursive_relative_path": True,
                 }
             },
         )
 
-    @cached_property
+    @path_cached_property(LAYOUT_PATH)
     def template(self) -> Template:
         return Template(LAYOUT_PATH.read_text())
 
+    @timed("book.compile")
     def compile(self) -> None:
-        if OUT_PATH.exists():
-            shutil.rmtree(OUT_PATH)
-        if ASSETS_PATH.exists():
-            shutil.copytree(ASSETS_PATH, OUT_PATH)
-        for file in resolve_any_path(SRC_GLOB):
-            self.compile_file(file)
+        with file_monitor().frozen():
+            files = list(resolve_any_path(SRC_GLOB))
+            assets = self.copy_assets()
+            self.prune({*assets, *(page_target(file)[0] for file in files)})
+
+            stale = [file for file in files if not self.up_to_date(file)]
+            count("book.pages", len(files))
+            count("book.stale-pages", len(stale))
+            self.prefetch(stale)
+            if self.jobs > 1 and len(stale) > 1:
+                self.compile_parallel(stale)
+            else:
+                for file in stale:
+                    self.compile_file(file)
+
+    @timed("book.prefetch")
+    def prefetch(self, files: list[Path]) -> None:
+        """
+        Evolves the sentences of every evolving macro in the pages at once,
+        including those of their dictionaries and affix tables,
+        so that the conversion only hits the evolve cache.
+        """
+        translator = self.conlang.translator
+        per_scope_forms: dict[Scope, list[ResolvedForm]] = {}
+
+        for file in files:
+            with config_scope_as(page_target(file)[1]):
+                for scope, forms in translator.resolve_all(
+                    evolve_payloads(self.expand(file)), skip_errors=True
+                ).items():
+                    per_scope_forms.setdefault(scope, [])
+                    per_scope_forms[scope].extend(forms)
+
+        translator.evolve_all(per_scope_forms, skip_errors=True)
+
+    def expand(self, file: Path) -> str:
+        """
+        The page with its includes, dictionaries and affix tables expanded.
+        A part that fails to expand is skipped, for the conversion to report.
+        """
+        preprocessors = self.converter_for(file).preprocessors
+        lines = file.read_text().split("\n")
+        try:
+            lines = preprocessors["mdx_include"].run(lines)
+        except RuntimeError:  # circular includes
+            pass
+
+        for name in ["conlang-dictionary", "conlang-affixes"]:
+            try:
+                lines = preprocessors[name].run(lines)
+            except (PyconlangError, PyrsercombError, KeyError):
+                pass
+
+        return "\n".join(lines)
+
+    def compile_parallel(self, files: list[Path]) -> None:
+        """
+        Compiles the pages in worker processes sharing the persistent caches.
+        """
+        self.conlang.translator.evolver.flush()
+
+        dependencies = {file: self.start_page(file) for file in files}
+        chunks = split_evenly(files, self.jobs)
+
+        with ProcessPoolExecutor(len(chunks), get_context("spawn")) as executor:
+            results = executor.map(
+                compile_pages,
+                [replace(config()) for _chunk in chunks],
+                chunks,
+                [profile().enabled for _chunk in chunks],
+            )
+            for chunk, (included, stats) in zip(chunks, results):
+                profile().merge(stats)
+                for file, paths in zip(chunk, included):
+                    self.finish_page(file, dependencies[file], paths)
+
+    @timed("book.assets")
+    def copy_assets(self) -> list[Path]:
+        targets = []
+        for asset in resolve_any_path((ASSETS_PATH, "**/*")):
+            if asset.is_dir():
+                continue
+
+            target = OUT_PATH / asset.relative_to(ASSETS_PATH)
+            if not target.exists() or not filecmp.cmp(asset, target):
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(asset, target)
+            targets.append(target)
+
+        return targets
+
+    def prune(self, targets: set[Path]) -> None:
+        """
+        Removes the outputs of deleted pages and assets.
+        """
+        for file in sorted(resolve_any_path((OUT_PATH, "**/*")), reverse=True):
+            if file.is_dir():
+                if not any(file.iterdir()):
+                    file.rmdir()
+            elif file not in targets:
+                file.unlink()
+
+        for page in list(self.pages):
+            if page_target(page)[0] not in targets:
+                del self.pages[page]
+
+    def up_to_date(self, file: Path) -> bool:
+        return (
+            file in self.pages
+            and self.pages[file].up_to_date()
+            and page_target(file)[0].exists()
+        )
 
+    @timed("book.page")
     def compile_file(self, file: Path) -> None:
-        assert file.suffixes == [".out", ".md"]
-        assert file.is_relative_to(SRC_PATH)
+        dependencies = self.start_page(file)
+        self.finish_page(file, dependencies, self.convert_file(file))
 
-        relative = file.relative_to(SRC_PATH)
+    def start_page(self, file: Path) -> PageDependencies:
+        dependencies = dependencies_for(file, included_in(self.pages.pop(file, None)))
+        dependencies.update()
+        return dependencies
 
-        stem = file.stem[:-4]
+    def finish_page(
+        self, file: Path, dependencies: PageDependencies, included: list[Path]
+    ) -> None:
+        if set(included) != set(included_in(dependencies)):
+            dependencies = dependencies_for(file, included)
+            dependencies.update()
 
-        scope = config().scope
-        if stem.startswith("%"):
-            stem = scope = stem[1:]
+        self.pages[file] = dependencies
 
-        if stem == relative.parent.stem:
-            relative = relative.parent
+    def convert_file(self, file: Path) -> list[Path]:
+        target, scope = page_target(file)
 
-        target = OUT_PATH / relative.with_name(f"{stem}.html")
+        converter = self.converter_for(file)
+        converter.reset()
+        getattr(converter, "mdx_include_content_cache_clean_local")()
 
-        self.converter_for(file).reset()
-
-        with config_scope_as(scope):
-            content = Template(self.converter_for(file).convert(file.read_text()))
+        with config_scope_as(scope), timer("book.convert"):
+            content = Template(converter.convert(file.read_text()))
             substitutions = config().to_dict()
 
-        substitutions["content"] = content.safe_substitute(**substitutions)
+        with timer("book.write"):
+            substitutions["content"] = content.safe_substitute(**substitutions)
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(self.template.safe_substitute(**substitutions))
+
+        return list(
+            map(Path, getattr(converter, "mdx_include_get_content_cache_local")())
+        )
+
+
+def compile_pages(
+    settings: Config, files: list[Path], profiled: bool = False
+) -> tuple[list[list[Path]], dict[str, Any]]:
+    with config_as(settings), profiling(profiled) as stats, Compiler.new(
+        eager=False
+    ) as compiler:
+        with file_monitor().frozen():
+            included = [compiler.convert_file(file) for file in files]
+
+    return included, stats.to_dict()
+
+
+def dependencies_for(file: Path, included: list[Path]) -> PageDependencies:
+    return PathCachedFunc([file, *PAGE_PATHS, *included], lambda: None, tracked=False)
 
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(self.template.safe_substitute(**substitutions))
+
+def included_in(dependencies: PageDependencies | None) -> list[Path]:
+    if dependencies is None:
+        return []
+
+    return cast(list[Path], dependencies.paths[1 + len(PAGE_PATHS) :])
+
+
+def page_target(file: Path) -> tuple[Path, str]:
+    assert file.suffixes == [".out", ".md"]
+    assert file.is_relative_to(SRC_PATH)
+
+    relative = file.relative_to(SRC_PATH)
+
+    stem = file.stem[:-4]
+
+    scope = config().scope
+    if stem.startswith("%"):
+        stem = scope = stem[1:]
+
+    if stem == relative.parent.stem:
+        relative = relative.parent
+
+    return OUT_PATH / relative.with_name(f"{stem}.html"), scope
 
 
 class Handler(PatternMatchingEventHandler):
@@ -138,6 +327,10 @@ class Handler(PatternMatchingEventHandler):
         self.last_error = None
         self.compile()
 
+    def dispatch(self, event: FileSystemEvent) -> None:
+        file_monitor().notify(event_paths(event))
+        super().dispatch(event)
+
     def on_any_event(self, event: FileSystemEvent) -> None:
         self.last_request = time.time()
         self.compile()
@@ -175,15 +368,20 @@ class Handler(PatternMatchingEventHandler):
             thread.join()
 
 
-def watch() -> None:
-    with Compiler.new() as compiler:
+def event_paths(event: FileSystemEvent) -> list[str]:
+    return [path for path in (event.src_path, getattr(event, "dest_path", "")) if path]
+
+
+def watch(jobs: int = 1) -> None:
+    with Compiler.new(jobs, eager=True) as compiler:
         handler = Handler(compiler)
         observer = Observer()
         observer.schedule(handler, str(SRC_PATH), recursive=True)
         observer.start()
         try:
-            while True:
-                time.sleep(1)
+            with file_monitor().observing(SRC_PATH):
+                while True:
+                    time.sleep(1)
         except KeyboardInterrupt:
             return
         finally:
@@ -192,6 +390,8 @@ def watch() -> None:
             handler.join()
 
 
-def compile_book() -> None:
-    with pass_exception(Compiler.new()) as compiler:
+def compile_book(jobs: int = 1) -> None:
+    with pass_exception(Compiler.new(jobs, eager=True)) as compiler:
         compiler.compile()
+        print(cache_registry().report())
+        print(f"Lexurgy servers: {lexurgy_processes().live()}")
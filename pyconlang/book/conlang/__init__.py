@@ -1,3 +1,4 @@
+import re
 from collections.abc import Generator
 from contextlib import contextmanager
 from typing import Self
@@ -11,7 +12,11 @@ from .advanced_macros import (
     AdvancedProtoMacro,
     GlossTableMacro,
 )
-from .batching_macros import BatchingPhoneticMacro, BatchingRomanizedMacro
+from .batching_macros import (
+    BatchingMacro,
+    BatchingPhoneticMacro,
+    BatchingRomanizedMacro,
+)
 from .before_after_macros import (
     AfterBeforePhoneticMacro,
     AfterBeforeRomanizedMacro,
@@ -21,6 +26,7 @@ from .before_after_macros import (
 from .dictionary import ConlangAffixes, ConlangDictionary, ConlangGrouper
 from .raw_macros import (
     RawDefinitionMacro,
+    RawEvolveMacro,
     RawPhoneticMacro,
     RawProtoMacro,
     RawRomanizedMacro,
@@ -117,3 +123,29 @@ class Conlang(Extension):
         md.preprocessors.register(
             ConlangAffixes(md, self.translator), "conlang-affixes", 40
         )
+
+
+EVOLVE_MACROS: list[type[RawEvolveMacro] | type[BatchingMacro]] = [
+    RawRomanizedMacro,
+    RawPhoneticMacro,
+    RawProtoMacro,
+    BatchingRomanizedMacro,
+    BatchingPhoneticMacro,
+    BeforeAfterRomanizedMacro,
+    BeforeAfterPhoneticMacro,
+    AfterBeforeRomanizedMacro,
+    AfterBeforePhoneticMacro,
+]
+
+EVOLVE_PATTERNS = [re.compile(macro.expression()) for macro in EVOLVE_MACROS]
+
+
+def evolve_payloads(text: str) -> set[str]:
+    """
+    The sentences that the evolving macros will send to the translator.
+    """
+    return {
+        match.group("text").strip()
+        for pattern in EVOLVE_PATTERNS
+        for match in pattern.finditer(text)
+    }
@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod
 
+from ...profile import timer
 from .advanced_macros import AdvancedMacro
 
 
@@ -7,12 +8,13 @@ class BatchingMacro(AdvancedMacro, metaclass=ABCMeta):
     batch: list[str] = []
 
     def run(self, lines: list[str]) -> list[str]:
-        self.batch = []
-        lines = super().run(lines)
+        with timer(f"book.preprocess.{type(self).__name__}"):
+            self.batch = []
+            lines = super().run(lines)
 
-        self.translator.resolve_and_evolve_all(self.batch)
+            self.translator.resolve_and_evolve_all(self.batch)
 
-        return lines
+            return lines
 
     def map_inner_text(self, text: str) -> str:
         self.batch.append(text.strip())
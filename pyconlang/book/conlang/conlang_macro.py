@@ -4,6 +4,7 @@ from abc import ABCMeta, abstractmethod
 from markdown import Markdown
 from markdown.preprocessors import Preprocessor
 
+from ...profile import timer
 from ...translate import Translator
 
 
@@ -27,7 +28,8 @@ class ConlangMacro(Preprocessor, metaclass=ABCMeta):
         ...
 
     def run(self, lines: list[str]) -> list[str]:
-        return [self.map_line(line) for line in lines]
+        with timer(f"book.preprocess.{type(self).__name__}"):
+            return [self.map_line(line) for line in lines]
 
     def map_line(self, line: str) -> str:
         return self.pattern.sub(self.map_match, line)
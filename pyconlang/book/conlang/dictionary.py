@@ -6,12 +6,14 @@ from markdown.preprocessors import Preprocessor
 from ... import CHANGES_GLOB, CHANGES_PATH, LEXICON_GLOB, LEXICON_PATH
 from ...cache import path_cached_method
 from ...domain import Scope
-from ...lexicon.domain import AffixDefinition, Entry, VarFusion
+from ...lexicon.domain import AffixDefinition, Entry
 from ...parser import scope as scope_parser
+from ...profile import timed
 from ...translate import Translator
 
 
 class ConlangGrouper(Preprocessor):
+    @timed("book.preprocess.ConlangGrouper")
     def run(self, lines: list[str]) -> list[str]:
         new_lines = []
         groups: list[str] = []
@@ -69,6 +71,7 @@ class ConlangDictionary(Preprocessor):
         self.translator = translator
         self.pattern = re.compile(r"^!dictionary:(?P<scope>%[A-Za-z0-9-]*|%%)$")
 
+    @timed("book.preprocess.ConlangDictionary")
     def run(self, lines: list[str]) -> list[str]:
         new_lines = []
         for line in lines:
@@ -97,8 +100,10 @@ class ConlangDictionary(Preprocessor):
         scope = entry.tags.scope
         form = str(entry.lexeme)
         forms = [
-            f"r[{scope} {self.show_var(var, form)}]"
-            for var in self.translator.lexicon.get_vars(entry.template)
+            f"r[{scope} {prefix}{form}{suffix}]"
+            for prefix, suffix in self.translator.lexicon.get_var_forms(
+                entry.template, scope
+            )
         ]
 
         return (
@@ -106,15 +111,6 @@ class ConlangDictionary(Preprocessor):
             + f" [ph({scope} {form})] pr[{scope} {form}] {entry.description()}"
         )
 
-    @staticmethod
-    def show_var(var: VarFusion, stem: str) -> str:
-        for prefix in var.prefixes:
-            stem = f"{prefix}{stem}"
-        for suffix in var.suffixes:
-            stem = f"{stem}{suffix}"
-
-        return stem
-
 
 class ConlangAffixes(Preprocessor):
     translator: Translator
@@ -127,6 +123,7 @@ class ConlangAffixes(Preprocessor):
         self.translator = translator
         self.pattern = re.compile(r"^!affixes:(?P<scope>%[A-Za-z0-9-]*|%%)$")
 
+    @timed("book.preprocess.ConlangAffixes")
     def run(self, lines: list[str]) -> list[str]:
         new_lines = []
         for line in lines:
@@ -1,17 +1,22 @@
 import pickle
-from collections.abc import Callable, Iterator, MutableMapping
+import sqlite3
+import weakref
+from collections.abc import Callable, Generator, Iterator, Mapping, MutableMapping
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from functools import cached_property
+from functools import cache, cached_property, wraps
 from itertools import chain
 from pathlib import Path
-from threading import RLock
+from threading import RLock, local
 from types import GenericAlias, TracebackType
 from typing import (
     Any,
+    Concatenate,
     Generic,
     Iterable,
     Optional,
     ParamSpec,
+    Protocol,
     Self,
     Type,
     TypeVar,
@@ -19,7 +24,7 @@ from typing import (
 )
 
 from . import PYCONLANG_PATH
-from .checksum import checksum
+from .checksum import checksum, fingerprint
 
 CACHE_PATH = PYCONLANG_PATH / "cache"
 
@@ -47,21 +52,271 @@ def resolve_any_path(path: AnyPath) -> Iterable[Path]:
             return parent.glob(pattern)
 
 
-class _NotFound:
-    pass
+@dataclass
+class FileMonitor:
+    """
+    Shares a single stat sweep of every watched path between all path caches.
+    The generation increases whenever the sweep sees a change.
+    Paths under an observed root are only updated through notify.
+    """
+
+    generation: int = 0
+    resolved: dict[AnyPath, tuple[Path, ...]] = field(default_factory=dict)
+    st_mtimes: dict[Path, float] = field(default_factory=dict)
+    observed: list[Path] = field(default_factory=list)
+    lock: RLock = field(default_factory=RLock)
+    state: local = field(default_factory=local)
+
+    @property
+    def is_frozen(self) -> bool:
+        return getattr(self.state, "depth", 0) > 0
+
+    @contextmanager
+    def frozen(self, swept: bool = False) -> Generator[None, None, None]:
+        """
+        Sweeps once, then serves every check in this thread from that sweep.
+        """
+        if not self.is_frozen and not swept:
+            self.sweep()
+
+        self.state.depth = getattr(self.state, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self.state.depth -= 1
+
+    def share(self, func: Callable[_P, _T]) -> Callable[_P, _T]:
+        """
+        Wraps func to run frozen in a worker thread,
+        reusing the sweep of the calling thread if it is frozen.
+        """
+        swept = self.is_frozen
+
+        @wraps(func)
+        def wrapped(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+            with self.frozen(swept):
+                return func(*args, **kwargs)
+
+        return wrapped
+
+    @contextmanager
+    def observing(self, root: Path) -> Generator[None, None, None]:
+        """
+        Stops polling the paths under root while a running observer notifies changes.
+        """
+        self.sweep()
+        with self.lock:
+            self.observed.append(root.absolute())
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.observed.remove(root.absolute())
+
+    def is_observed(self, path: AnyPath) -> bool:
+        root = any_path_root(path).absolute()
+        return any(root.is_relative_to(observed) for observed in self.observed)
+
+    def watch(self, paths: Iterable[AnyPath]) -> None:
+        with self.lock:
+            for path in paths:
+                if path not in self.resolved:
+                    self.resolved[path] = tuple(resolve_any_path(path))
+                    self.st_mtimes.update(stat_paths(self.resolved[path]))
+
+    def sweep(self) -> None:
+        with self.lock:
+            self.refresh(
+                [path for path in self.resolved if not self.is_observed(path)],
+                lambda _path: True,
+            )
+
+    def notify(self, paths: Iterable[str | Path]) -> None:
+        changed = [Path(path).absolute() for path in paths]
+
+        def is_changed(path: Path) -> bool:
+            return any(path.absolute().is_relative_to(other) for other in changed)
+
+        with self.lock:
+            self.refresh(
+                [
+                    path
+                    for path in self.resolved
+                    if is_related(any_path_root(path).absolute(), changed)
+                ],
+                is_changed,
+            )
+
+    def refresh(self, paths: list[AnyPath], is_changed: Callable[[Path], bool]) -> None:
+        old = set(chain(*(self.resolved[path] for path in paths)))
+        resolved = {path: tuple(resolve_any_path(path)) for path in paths}
+        new = set(chain(*resolved.values()))
+        st_mtimes = stat_paths(
+            file for file in new if file not in self.st_mtimes or is_changed(file)
+        )
+
+        if old != new or any(
+            self.st_mtimes.get(file) != st_mtime for file, st_mtime in st_mtimes.items()
+        ):
+            self.generation += 1
+
+        for file in old - new:
+            if file in self.st_mtimes:
+                del self.st_mtimes[file]
+
+        self.resolved.update(resolved)
+        self.st_mtimes.update(st_mtimes)
+
+    def current(self, paths: Iterable[AnyPath]) -> int:
+        self.watch(paths)
+        if not self.is_frozen:
+            self.sweep()
+
+        return self.generation
+
+    def paths(self, paths: Iterable[AnyPath]) -> list[Path]:
+        self.watch(paths)
+        return list(chain(*(self.resolved[path] for path in paths)))
+
+    def st_mtime(self, path: Path) -> float:
+        if path in self.st_mtimes:
+            return self.st_mtimes[path]
+
+        return path.stat().st_mtime
+
+
+def is_related(root: Path, changed: list[Path]) -> bool:
+    return any(
+        other.is_relative_to(root) or root.is_relative_to(other) for other in changed
+    )
+
+
+def any_path_root(path: AnyPath) -> Path:
+    match path:
+        case Path():
+            return path
+        case str():
+            return Path()
+        case _:
+            return path[0]
+
+
+def stat_paths(paths: Iterable[Path]) -> dict[Path, float]:
+    st_mtimes = {}
+    for path in paths:
+        try:
+            st_mtimes[path] = path.stat().st_mtime
+        except FileNotFoundError:
+            pass
+
+    return st_mtimes
+
+
+@cache
+def file_monitor() -> FileMonitor:
+    return FileMonitor()
 
 
-def hash_or_id(value: Any) -> int:
-    if isinstance(value, tuple):
-        return hash(tuple(hash_or_id(element) for element in value))
+def frozen(func: Callable[_P, _T]) -> Callable[_P, _T]:
+    """
+    Runs the function with the file monitor frozen,
+    so that all of its cache checks share one sweep.
+    """
+
+    @wraps(func)
+    def wrapped(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+        with file_monitor().frozen():
+            return func(*args, **kwargs)
+
+    return wrapped
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size: int | None = None
+    evictions: int = 0
+
+    def __add__(self, other: "CacheStats") -> "CacheStats":
+        size = None
+        if self.size is not None or other.size is not None:
+            size = (self.size or 0) + (other.size or 0)
+
+        return CacheStats(
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.invalidations + other.invalidations,
+            self.entries + other.entries,
+            size,
+            self.evictions + other.evictions,
+        )
+
 
-    try:
-        return hash(value)
-    except TypeError:
-        return id(value)
+class HasCacheStats(Protocol):
+    @property
+    def name(self) -> str:
+        ...
+
+    def stats(self) -> CacheStats:
+        ...
+
+
+@dataclass
+class CacheRegistry:
+    """
+    Weak references to every live cache, for reporting their stats by name.
+    """
+
+    caches: list[weakref.ref[HasCacheStats]] = field(default_factory=list)
+    lock: RLock = field(default_factory=RLock)
+
+    def register(self, cache: HasCacheStats) -> None:
+        with self.lock:
+            self.caches.append(weakref.ref(cache))
+
+    def live(self) -> list[HasCacheStats]:
+        with self.lock:
+            self.caches = [ref for ref in self.caches if ref() is not None]
+            return [cache for ref in self.caches if (cache := ref()) is not None]
+
+    def stats(self) -> dict[str, CacheStats]:
+        stats: dict[str, CacheStats] = {}
+        for cache in self.live():
+            stats[cache.name] = stats.get(cache.name, CacheStats()) + cache.stats()
+
+        return dict(sorted(stats.items()))
+
+    def report(self) -> str:
+        stats = self.stats()
+        width = max(map(len, stats), default=5)
+        lines = [
+            f"{'cache':<{width}} {'hits':>8} {'misses':>8} {'invalid':>8}"
+            f" {'evicted':>8} {'entries':>8} {'size':>10}"
+        ]
+        for name, cache in stats.items():
+            size = "-" if cache.size is None else f"{cache.size / 1024:.1f}K"
+            lines.append(
+                f"{name:<{width}} {cache.hits:>8} {cache.misses:>8}"
+                f" {cache.invalidations:>8} {cache.evictions:>8}"
+                f" {cache.entries:>8} {size:>10}"
+            )
+
+        return "\n".join(lines)
+
+
+@cache
+def cache_registry() -> CacheRegistry:
+    return CacheRegistry()
+
+
+class _NotFound:
+    pass
 
 
-_empty_tuple_hash = hash(())
+_NO_ARGS = fingerprint(())
 
 
 @dataclass
@@ -70,70 +325,174 @@ class PathCachedFunc(Generic[_P, _T]):
     func: Callable[_P, _T]
     st_mtimes: dict[Path, float] | None = field(default=None)
     checksums: dict[Path, bytes] | None = field(default=None)
-    value: dict[int, _T] = field(default_factory=dict)
+    value: dict[bytes, _T] = field(default_factory=dict)
+    name: str = field(default="")
+    tracked: bool = field(default=True)
+    max_size: int | None = field(default=None)
+    dispose: Callable[[_T], None] | None = field(default=None)
     lock: RLock = field(default_factory=RLock, init=False)
+    generation: int = field(default=-1, init=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    invalidations: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        if not self.name:
+            self.name = getattr(self.func, "__qualname__", repr(self.func))
+        if self.tracked:
+            cache_registry().register(self)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            self.hits,
+            self.misses,
+            self.invalidations,
+            len(self.value),
+            None,
+            self.evictions,
+        )
 
     def all_paths(self) -> list[Path]:
-        return list(chain(*(resolve_any_path(path) for path in self.paths)))
+        return file_monitor().paths(self.paths)
 
     def up_to_date(self) -> bool:
         if self.checksums is None or self.st_mtimes is None:
             return False
 
+        generation = file_monitor().current(self.paths)
+        if generation == self.generation:
+            return True
+
+        paths = self.all_paths()
+        if set(paths) != self.checksums.keys():  # paths were added or removed
+            return False
+
         modified = [
             path
-            for path in self.all_paths()
-            if self.st_mtimes.get(path, 0) < path.stat().st_mtime
+            for path in paths
+            if self.st_mtimes.get(path, 0) < file_monitor().st_mtime(path)
         ]
 
         for path in modified:
             if self.checksums.get(path) != checksum(path):
                 return False
 
+        self.generation = generation
         return True
 
     def update(self) -> None:
+        if self.checksums is not None:
+            self.invalidations += 1
+
+        generation = file_monitor().current(self.paths)
         paths = self.all_paths()
-        self.st_mtimes = {path: path.stat().st_mtime for path in paths}
+        self.st_mtimes = {path: file_monitor().st_mtime(path) for path in paths}
         self.checksums = {path: checksum(path) for path in paths}
-        self.value = {}
+        self.clear()
+        self.generation = generation
+
+    def clear(self) -> None:
+        """
+        Drops every value, disposing of them first.
+        """
+        with self.lock:
+            values, self.value = self.value, {}
+
+        if self.dispose is not None:
+            for value in values.values():
+                self.dispose(value)
 
     def __call__(self, *args: _P.args, **kwargs: _P.kwargs) -> _T:
-        hashed = hash_or_id(tuple(args))
+        hashed = fingerprint(args)
         if not self.up_to_date():
             with self.lock:
                 if not self.up_to_date():
                     self.update()
 
-        if hashed not in self.value:
-            self.value[hashed] = self.func(*args, **kwargs)
+        if self.max_size is None:
+            if hashed in self.value:
+                self.hits += 1
+                return self.value[hashed]
+        else:
+            with self.lock:
+                if hashed in self.value:
+                    self.hits += 1
+                    value = self.value[hashed] = self.value.pop(hashed)
+                    return value
+
+        self.misses += 1
+        value = self.func(*args, **kwargs)
+
+        evicted = []
+        with self.lock:
+            self.value[hashed] = value
+            while self.max_size is not None and len(self.value) > self.max_size:
+                evicted.append(self.value.pop(next(iter(self.value))))
+                self.evictions += 1
+
+        if self.dispose is not None:
+            for old in evicted:
+                self.dispose(old)
+
+        return value
+
+
+def bind_weakly(
+    func: Callable[Concatenate[_C, _P], _T], instance: _C
+) -> Callable[_P, _T]:
+    owner = weakref.ref(instance)
 
-        assert self.checksums is not None
-        assert hashed in self.value
+    def bound(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+        current = owner()
+        assert current is not None
+        return func(current, *args, **kwargs)
 
-        return self.value[hashed]
+    return bound
 
 
-def path_cache(*paths: AnyPath) -> Callable[[Callable[_P, _T]], PathCachedFunc[_P, _T]]:
+def path_cache(
+    *paths: AnyPath,
+    max_size: int | None = None,
+    dispose: Callable[[Any], None] | None = None,
+) -> Callable[[Callable[_P, _T]], PathCachedFunc[_P, _T]]:
+    """
+    With a `max_size`, the least recently used values are evicted beyond it.
+    Invalidated and evicted values are passed to `dispose`.
+    """
+
     def wrapper(func: Callable[_P, _T]) -> PathCachedFunc[_P, _T]:
-        return PathCachedFunc(list(paths), func)
+        return PathCachedFunc(list(paths), func, max_size=max_size, dispose=dispose)
 
     return wrapper
 
 
 def path_cached_method(
     *paths: AnyPath,
+    max_size: int | None = None,
+    dispose: Callable[[Any], None] | None = None,
 ) -> Callable[[Callable[_P, _T]], Callable[_P, _T]]:
+    """
+    Keeps a cache per instance, which only holds a weak reference to the instance
+    and is dropped when the instance is collected.
+    """
+
     def wrapper(func: Callable[_P, _T]) -> Callable[_P, _T]:
         caches: dict[int, PathCachedFunc[_P, _T]] = {}
 
+        def forget(key: int) -> None:
+            caches.pop(key, None)
+
         def wrapped(self: Any, *args: _P.args, **kwargs: _P.kwargs) -> _T:
             if id(self) not in caches:
-
-                def wrapped_func(*inner_args: _P.args, **inner_kwargs: _P.kwargs) -> _T:
-                    return func(self, *inner_args, **inner_kwargs)
-
-                caches[id(self)] = PathCachedFunc(list(paths), wrapped_func)
+                caches[id(self)] = PathCachedFunc(
+                    list(paths),
+                    bind_weakly(cast(Callable[Concatenate[Any, _P], _T], func), self),
+                    name=func.__qualname__,
+                    max_size=max_size,
+                    dispose=dispose,
+                )
+                weakref.finalize(self, forget, id(self))
 
             return caches[id(self)](*args, **kwargs)
 
@@ -145,15 +504,22 @@ def path_cached_method(
 class PathCachedProperty(Generic[_C, _T]):
     paths: list[AnyPath]
     func: Callable[[_C], _T]
+    dispose: Callable[[_T], None] | None
     attrname: str | None
 
     @cached_property
     def lock(self) -> RLock:
         return RLock()
 
-    def __init__(self, paths: list[AnyPath], func: Callable[[_C], _T]) -> None:
+    def __init__(
+        self,
+        paths: list[AnyPath],
+        func: Callable[[_C], _T],
+        dispose: Callable[[_T], None] | None = None,
+    ) -> None:
         self.paths = paths
         self.func = func
+        self.dispose = dispose
         self.attrname = None
         self.__doc__ = func.__doc__
 
@@ -195,7 +561,12 @@ class PathCachedProperty(Generic[_C, _T]):
                 # check if another thread filled cache while we awaited lock
                 val = cache.get(self.hidden_name, _NotFound)
                 if val is _NotFound:
-                    val = PathCachedFunc(self.paths, self.func)
+                    val = PathCachedFunc(
+                        self.paths,
+                        bind_weakly(self.func, instance),
+                        name=self.func.__qualname__,
+                        dispose=self.dispose,
+                    )
                     try:
                         cache[self.hidden_name] = val
                     except TypeError:
@@ -204,61 +575,304 @@ class PathCachedProperty(Generic[_C, _T]):
                             f"does not support item assignment for caching {self.attrname!r} property."
                         )
                         raise TypeError(msg) from None
-        return cast(_T, val(instance))
+        return cast(_T, val())
 
     __class_getitem__ = classmethod(GenericAlias)
 
 
 def path_cached_property(
     *paths: AnyPath,
+    dispose: Callable[[Any], None] | None = None,
 ) -> Callable[[Callable[[_C], _T]], PathCachedProperty[_C, _T]]:
     def wrap(func: Callable[[_C], _T]) -> PathCachedProperty[_C, _T]:
-        return PathCachedProperty(list(paths), func)
+        return PathCachedProperty(list(paths), func, dispose)
 
     return wrap
 
 
+def _no_partition(_item: object) -> str:
+    return ""
+
+
+def _no_partition_paths(_partition: str) -> list[AnyPath]:
+    return []
+
+
 @dataclass
 class PersistentDict(Generic[_K, _V], MutableMapping[_K, _V]):
     name: str
     paths: list[AnyPath]
+    partition: Callable[[_K], str] = field(default=_no_partition)
+    partition_paths: Callable[[str], list[AnyPath]] = field(default=_no_partition_paths)
+    funcs: dict[str, PathCachedFunc[[], dict[_K, _V]]] = field(
+        default_factory=dict, init=False
+    )
+    dirty: set[_K] = field(default_factory=set, init=False)
+    cleared: set[str] = field(default_factory=set, init=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        cache_registry().register(self)
+
+    def stats(self) -> CacheStats:
+        """
+        Flushes first, so that the entries and the size of the pickled keys and
+        values are counted from the database.
+        """
+        self.flush()
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(item) + LENGTH(value)), 0)"
+                " FROM entries"
+            ).fetchone()
+
+        return CacheStats(
+            self.hits,
+            self.misses,
+            sum(func.invalidations for func in self.funcs.values()),
+            entries,
+            size,
+        )
 
     @cached_property
     def cache_path(self) -> Path:
-        return (CACHE_PATH / self.name).with_suffix(".cache")
+        return (CACHE_PATH / self.name).with_suffix(".sqlite")
 
     @cached_property
-    def func(self) -> PathCachedFunc[[], dict[_K, _V]]:
-        if not self.cache_path.exists():
-            return PathCachedFunc(self.paths, dict)
-
-        value, st_times, checksums = pickle.loads(self.cache_path.read_bytes())
+    def lock(self) -> RLock:
+        return RLock()
 
-        return PathCachedFunc(
-            self.paths, dict, st_times, checksums, {_empty_tuple_hash: value}
+    @cached_property
+    def connection(self) -> sqlite3.Connection:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            self.cache_path, timeout=60, check_same_thread=False
         )
+        connection.execute("PRAGMA journal_mode=WAL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            connection.executescript(_DROP_SCHEMA)
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def all_paths_for(self, partition: str) -> list[AnyPath]:
+        return self.paths + self.partition_paths(partition)
+
+    def func_for(self, partition: str) -> PathCachedFunc[[], dict[_K, _V]]:
+        with self.lock:
+            if partition not in self.funcs:
+                self.funcs[partition] = self.load_func(partition)
+
+            return self.funcs[partition]
+
+    def load_func(self, partition: str) -> PathCachedFunc[[], dict[_K, _V]]:
+        paths = self.all_paths_for(partition)
+
+        def reset() -> dict[_K, _V]:
+            return self.reset(partition)
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE name = ?", (partition,)
+            ).fetchone()
+
+        if row is None:
+            func = PathCachedFunc(paths, reset, tracked=False)
+        else:
+            st_mtimes, checksums = pickle.loads(row[0])
+            func = PathCachedFunc(
+                paths, reset, st_mtimes, checksums, {_NO_ARGS: {}}, tracked=False
+            )
 
-    @property
-    def value(self) -> dict[_K, _V]:
-        return self.func()
+        # sharing the lock keeps partition reloads and writes in a single order
+        func.lock = self.lock
+        return func
+
+    def reset(self, partition: str) -> dict[_K, _V]:
+        with self.lock:
+            self.cleared.add(partition)
+            self.dirty = {key for key in self.dirty if self.partition(key) != partition}
+        return {}
+
+    def value_for(self, partition: str) -> dict[_K, _V]:
+        func = self.func_for(partition)
+        if not func.up_to_date():
+            with self.lock:
+                func.paths = self.all_paths_for(partition)
+
+        return func()
+
+    def stale(self, partition: str) -> bool:
+        return not self.func_for(partition).up_to_date()
+
+    def partition_items(self, partition: str) -> dict[_K, _V]:
+        """
+        All entries of the partition, without checking whether they are up-to-date.
+        """
+        items: dict[_K, _V] = {}
+        if partition not in self.cleared:
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT item, value FROM entries WHERE partition = ?",
+                    (partition,),
+                ).fetchall()
+            items = {pickle.loads(item): pickle.loads(value) for item, value in rows}
+
+        with self.lock:
+            loaded = dict(self.loaded(partition))
+            for key in self.dirty:
+                if key in items and key not in loaded:
+                    del items[key]
+
+        return items | loaded
+
+    def replace_partition(self, partition: str, items: Mapping[_K, _V]) -> None:
+        func = self.func_for(partition)
+        with self.lock:
+            func.paths = self.all_paths_for(partition)
+            func.update()
+            value = func()
+            value.update(items)
+            self.dirty.update(items)
+
+    def value_of(self, item: _K) -> dict[_K, _V]:
+        return self.value_for(self.partition(item))
+
+    def loaded(self, partition: str) -> dict[_K, _V]:
+        return self.func_for(partition).value.get(_NO_ARGS, {})
+
+    @staticmethod
+    def key_of(item: object) -> str:
+        return fingerprint(item).hex()
+
+    def load(self, item: _K) -> _V:
+        if self.partition(item) in self.cleared or item in self.dirty:
+            raise KeyError(item)
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (self.key_of(item),)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(item)
+
+        value: _V = pickle.loads(row[0])
+        return value
 
     def __getitem__(self, item: _K) -> _V:
-        return self.value[item]
+        value = self.value_of(item)
+        if item not in value:
+            try:
+                value[item] = self.load(item)
+            except KeyError:
+                self.misses += 1
+                raise
+
+        self.hits += 1
+        return value[item]
 
     def __setitem__(self, key: _K, value: _V) -> None:
-        self.value[key] = value
+        with self.lock:
+            self.value_of(key)[key] = value
+            self.dirty.add(key)
 
     def __delitem__(self, key: _K) -> None:
-        del self.value[key]
+        with self.lock:
+            value = self.value_of(key)
+            if key not in value:
+                value[key] = self.load(key)
+
+            del value[key]
+            self.dirty.add(key)
 
     def __len__(self) -> int:
-        return len(self.value)
+        self.validate()
+        with self.lock:
+            count: int = self.connection.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()[0]
+        return count
 
     def __iter__(self) -> Iterator[_K]:
-        return iter(self.value)
+        self.validate()
+        with self.lock:
+            rows = self.connection.execute("SELECT item FROM entries").fetchall()
+        return iter(pickle.loads(row[0]) for row in rows)
 
     def __contains__(self, item: object) -> bool:
-        return item in self.value
+        try:
+            self[cast(_K, item)]
+        except KeyError:
+            return False
+        return True
+
+    def validate(self) -> None:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT partition FROM entries"
+            ).fetchall()
+
+        for (partition,) in rows:
+            self.value_for(partition)
+
+        self.flush()
+
+    def flush(self) -> None:
+        with self.lock, self.connection as connection:
+            for partition in self.cleared:
+                connection.execute(
+                    "DELETE FROM entries WHERE partition = ?", (partition,)
+                )
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                (
+                    (partition, pickle.dumps((func.st_mtimes, func.checksums)))
+                    for partition, func in self.funcs.items()
+                ),
+            )
+
+            for key in self.dirty:
+                value = self.loaded(self.partition(key))
+                if key in value:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                        (
+                            self.key_of(key),
+                            self.partition(key),
+                            pickle.dumps(key),
+                            pickle.dumps(value[key]),
+                        ),
+                    )
+                else:
+                    connection.execute(
+                        "DELETE FROM entries WHERE key = ?", (self.key_of(key),)
+                    )
+
+            compact = bool(self.cleared)
+            self.cleared = set()
+            self.dirty = set()
+
+        if compact:
+            self.compact()
+
+    def compact(self) -> None:
+        with self.lock:
+            free_pages, pages = (
+                self.connection.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("freelist_count", "page_count")
+            )
+            if free_pages > pages // 2:
+                self.connection.execute("VACUUM")
+
+    def close(self) -> None:
+        """
+        Flushes and closes the connection; using the dict again reopens it.
+        """
+        self.flush()
+        with self.lock:
+            self.__dict__.pop("connection").close()
 
     def __enter__(self) -> Self:
         return self
@@ -269,8 +883,22 @@ class PersistentDict(Generic[_K, _V], MutableMapping[_K, _V]):
         _exc_val: Optional[BaseException],
         _exc_tb: Optional[TracebackType],
     ) -> bool:
-        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-        self.cache_path.write_bytes(
-            pickle.dumps((self.value, self.func.st_mtimes, self.func.checksums))
-        )
+        self.close()
         return exc_type is None
+
+
+_SCHEMA_VERSION = 2
+
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS meta;
+DROP TABLE IF EXISTS entries;
+"""
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY, partition TEXT, item BLOB, value BLOB
+);
+CREATE INDEX IF NOT EXISTS entries_partition ON entries (partition);
+PRAGMA user_version = {_SCHEMA_VERSION};
+"""
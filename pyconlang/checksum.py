@@ -1,6 +1,68 @@
+from dataclasses import fields, is_dataclass
+from enum import Enum
 from hashlib import md5
 from pathlib import Path
+from typing import Any
+
+FINGERPRINT_ATTR = "_fingerprint"
 
 
 def checksum(path: Path) -> bytes:
     return md5(path.read_bytes()).digest()
+
+
+def fingerprint(value: Any) -> bytes:
+    """
+    An md5 digest of the value's structure, stable across processes.
+    Frozen dataclasses keep theirs after the first call.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        frozen = type(value).__dataclass_params__.frozen and hasattr(value, "__dict__")
+        if frozen and FINGERPRINT_ATTR in value.__dict__:
+            cached: bytes = value.__dict__[FINGERPRINT_ATTR]
+            return cached
+
+        names = [field.name for field in fields(value)]
+        digest = md5(
+            f"D{type(value).__module__}.{type(value).__qualname__}{names}".encode()
+        )
+        for name in names:
+            digest.update(fingerprint(getattr(value, name)))
+
+        if frozen:
+            value.__dict__[FINGERPRINT_ATTR] = digest.digest()
+        return digest.digest()
+
+    return md5(encode(value)).digest()
+
+
+def encode(value: Any) -> bytes:
+    match value:
+        case None:
+            return b"N"
+        case bool():
+            return b"B1" if value else b"B0"
+        case Enum():
+            return f"E{type(value).__module__}.{type(value).__qualname__}.{value.name}".encode()
+        case int():
+            return f"I{value}".encode()
+        case float():
+            return f"F{value!r}".encode()
+        case str():
+            return b"S" + value.encode()
+        case bytes():
+            return b"Y" + value
+        case Path():
+            return f"P{value}".encode()
+        case tuple() | list():
+            return b"T" + b"".join(map(fingerprint, value))
+        case frozenset() | set():
+            return b"Z" + b"".join(sorted(map(fingerprint, value)))
+        case dict():
+            return b"M" + b"".join(
+                sorted(
+                    fingerprint(key) + fingerprint(item) for key, item in value.items()
+                )
+            )
+        case _:
+            raise TypeError(f"Cannot fingerprint {type(value).__name__}")
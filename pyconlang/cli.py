@@ -1,7 +1,10 @@
 import shutil
+from collections.abc import Callable
+from functools import wraps
 from importlib.resources import files
 from importlib.resources.abc import Traversable
 from pathlib import Path
+from typing import Any
 
 import click
 
@@ -10,6 +13,8 @@ from .assets import LEXURGY_VERSION
 from .book import compile_book
 from .book import watch as watch_book
 from .config import Config, with_file_config
+from .daemon import forward, serve, stop
+from .profile import profiling
 from .repl import run as run_repl
 
 
@@ -18,6 +23,36 @@ def run() -> None:
     pass
 
 
+def profile_options(func: Callable[..., None]) -> Callable[..., None]:
+    @click.option(
+        "--profile",
+        "profiled",
+        is_flag=True,
+        default=False,
+        help="Print the time spent in each stage",
+    )
+    @click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Write the time spent in each stage as JSON",
+    )
+    @wraps(func)
+    def wrapped(
+        *args: Any, profiled: bool, profile_json: Path | None, **kwargs: Any
+    ) -> None:
+        with profiling(profiled or profile_json is not None) as stats:
+            try:
+                func(*args, **kwargs)
+            finally:
+                if profiled:
+                    click.echo(stats.report(), err=True)
+                if profile_json is not None:
+                    stats.save(profile_json)
+
+    return wrapped
+
+
 @run.command
 def reset() -> None:
     try:
@@ -78,9 +113,42 @@ def copy_recursive(parent: Path, overwrite: bool, traversable: Traversable) -> N
 
 @run.command
 @click.argument("command", nargs=-1)
+@profile_options
+@click.option(
+    "--local",
+    is_flag=True,
+    default=False,
+    help="Translate in this process even if a daemon is running",
+)
+@with_file_config
+def repl(command: list[str], local: bool) -> None:
+    line = " ".join(command)
+    if line and not local and (output := forward(line)) is not None:
+        click.echo(output)
+        return
+
+    run_repl(line)
+
+
+@run.command
+@click.option(
+    "-s", "--stop", "stopping", is_flag=True, default=False, help="Stop the daemon"
+)
 @with_file_config
-def repl(command: list[str]) -> None:
-    run_repl(" ".join(command))
+def daemon(stopping: bool) -> None:
+    """
+    Keeps a translator and Lexurgy running, so that `repl COMMAND` answers quickly.
+    """
+    if stopping:
+        if not stop():
+            click.echo("No daemon is running", err=True)
+        return
+
+    click.echo("Listening, press Ctrl-C to stop", err=True)
+    try:
+        serve()
+    except KeyboardInterrupt:
+        pass
 
 
 @run.group
@@ -88,5 +156,15 @@ def book() -> None:
     pass
 
 
-book.command(name="watch")(with_file_config(watch_book))
-book.command(name="compile")(with_file_config(compile_book))
+jobs_option = click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    show_default=True,
+    help="Number of processes compiling pages in parallel",
+)
+
+book.command(name="watch")(jobs_option(with_file_config(watch_book)))
+book.command(name="compile")(
+    jobs_option(profile_options(with_file_config(compile_book)))
+)
@@ -19,6 +19,12 @@ class Config:
     author: str = ""
     syllables: bool = False
     scope: str = ""
+    lexurgy_servers: int = 1
+    lexurgy_idle_timeout: float = 0.0
+    lexurgy_heap: str = ""
+    lexurgy_coalesce: bool = False
+    lexurgy_coalesce_window: float = 0.0
+    incremental_evolve: bool = False
 
     @classmethod
     def from_file(cls, path: Path = CONFIG_PATH) -> Self:
@@ -0,0 +1,126 @@
+import json
+import socket
+from contextlib import suppress
+from dataclasses import asdict
+from pathlib import Path
+from socketserver import StreamRequestHandler, UnixStreamServer
+from threading import Thread
+from typing import Any
+
+from . import PYCONLANG_PATH
+from .cache import file_monitor
+from .config import Config, config, config_as
+from .errors import DaemonAlreadyRunning
+from .repl import Mode, run_line
+from .translate import Translator
+
+DAEMON_PATH = PYCONLANG_PATH / "daemon.sock"
+
+
+class DaemonServer(UnixStreamServer):
+    """
+    Serves repl commands from a single warm translator, one request at a time.
+    """
+
+    translator: Translator
+
+    def __init__(self, path: Path, translator: Translator) -> None:
+        self.translator = translator
+        super().__init__(str(path), DaemonHandler)
+
+    def warm(self) -> None:
+        """
+        Loads the lexicon up front; errors are reported by the first request instead.
+        """
+        with suppress(Exception), file_monitor().frozen():
+            self.translator.cached_lexicon
+
+    def evaluate(self, request: dict[str, Any]) -> str:
+        with config_as(Config(**request["config"])):
+            return run_line(self.translator, request["line"], Mode[request["mode"]])
+
+
+class DaemonHandler(StreamRequestHandler):
+    server: DaemonServer
+
+    def handle(self) -> None:
+        for raw in self.rfile:
+            request = json.loads(raw)
+            match request["command"]:
+                case "ping":
+                    self.respond({"output": ""})
+                case "stop":
+                    Thread(target=self.server.shutdown).start()
+                    self.respond({"output": ""})
+                    return
+                case _:
+                    self.respond({"output": self.server.evaluate(request)})
+
+    def respond(self, response: dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+        self.wfile.flush()
+
+
+def serve(path: Path = DAEMON_PATH) -> None:
+    """
+    Runs the daemon until it is stopped, removing the socket when it exits.
+    """
+    if running(path):
+        raise DaemonAlreadyRunning(f"A daemon is already listening on {path}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+
+    with Translator.new(eager=True) as translator, DaemonServer(
+        path, translator
+    ) as server:
+        try:
+            server.warm()
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def request(payload: dict[str, Any], path: Path = DAEMON_PATH) -> str | None:
+    """
+    Sends a request to the daemon, or returns None if none is running.
+    """
+    if not path.exists():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(path))
+            client.sendall(json.dumps(payload).encode() + b"\n")
+            with client.makefile("rb") as reader:
+                response = reader.readline()
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None
+
+    if not response:
+        return None
+
+    output: str = json.loads(response)["output"]
+    return output
+
+
+def forward(
+    line: str, mode: Mode = Mode.NORMAL, path: Path = DAEMON_PATH
+) -> str | None:
+    return request(
+        {
+            "command": "run",
+            "line": line,
+            "mode": mode.name,
+            "config": asdict(config()),
+        },
+        path,
+    )
+
+
+def running(path: Path = DAEMON_PATH) -> bool:
+    return request({"command": "ping"}, path) is not None
+
+
+def stop(path: Path = DAEMON_PATH) -> bool:
+    return request({"command": "stop"}, path) is not None
@@ -13,6 +13,10 @@ class DoubleTagDefinition(PyconlangError):
     ...
 
 
+class DaemonAlreadyRunning(PyconlangError):
+    ...
+
+
 def show_exception(exception: Exception) -> str:
     return f"{type(exception).__name__}: {exception}"
 
@@ -1,24 +1,41 @@
-from collections.abc import Generator, Mapping, Sequence
+from collections.abc import Generator, Iterable, Mapping, Sequence
 from contextlib import contextmanager
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import MutableMapping, Self, cast
 from unicodedata import normalize
 
-from .. import CHANGES_GLOB, CHANGES_PATH
-from ..cache import PersistentDict
+from ..cache import AnyPath, PersistentDict, frozen
+from ..config import config
 from ..domain import ResolvedForm
-from ..lexurgy import LexurgyClient
+from ..lexurgy import LexurgyClient, split_evenly
 from ..lexurgy.domain import (
+    AnyLexurgyResponse,
     LexurgyErrorResponse,
     LexurgyRequest,
     LexurgyResponse,
     TraceLine,
 )
+from ..lexurgy.includes import traverse_includes
 from ..lexurgy.tracer import parse_trace_lines
+from ..profile import count, timed, timer
 from ..strings import remove_syllable_break
-from .arrange import AffixArranger, arranger_for
-from .batch import Batcher, ComponentQuery, CompoundQuery, Query, segment_by_start_end
+from .arrange import (
+    AffixArranger,
+    RuleFingerprints,
+    arranger_for,
+    fingerprint_rules,
+    first_changed_rule,
+    removed_rules,
+)
+from .batch import (
+    Batcher,
+    ComponentQuery,
+    CompoundQuery,
+    Query,
+    Segment,
+    segment_by_start_end,
+)
 from .domain import Evolved
 from .errors import LexurgyError
 from .tuple_mapping_view import TupleMappingView
@@ -26,12 +43,18 @@ from .tuple_mapping_view import TupleMappingView
 QueryTrace = tuple[str, list[TraceLine]]
 Trace = list[QueryTrace]
 EvolvedWithTrace = tuple[Evolved, Trace]
+EvolvedWords = tuple[list[Evolved], Mapping[str, list[TraceLine]]]
+QueryCache = dict[tuple[Path, Query], Evolved]
+TraceCache = dict[tuple[Path, Query], list[TraceLine]]
+
+MIN_SHARD_SIZE = 64
 
 
 @dataclass
 class Evolver:
     query_cache: PersistentDict[tuple[Path, Query], Evolved]
     trace_cache: PersistentDict[tuple[Path, Query], list[TraceLine]]
+    rules_cache: PersistentDict[Path, RuleFingerprints]
     batcher: Batcher = field(default_factory=Batcher)
 
     @classmethod
@@ -39,12 +62,20 @@ class Evolver:
     def new(cls) -> Generator[Self, None, None]:
         with cast(
             PersistentDict[tuple[Path, Query], Evolved],
-            PersistentDict("evolve-cache", [CHANGES_PATH, CHANGES_GLOB]),
+            PersistentDict("evolve-cache", [], changes_partition, changes_paths),
         ) as query_cache, cast(
             PersistentDict[tuple[Path, Query], list[TraceLine]],
-            PersistentDict("trace-cache", [CHANGES_PATH, CHANGES_GLOB]),
-        ) as trace_cache:
-            yield cls(query_cache, trace_cache)
+            PersistentDict("trace-cache", [], changes_partition, changes_paths),
+        ) as trace_cache, cast(
+            PersistentDict[Path, RuleFingerprints],
+            PersistentDict("rules-cache", []),
+        ) as rules_cache:
+            yield cls(query_cache, trace_cache, rules_cache)
+
+    def flush(self) -> None:
+        self.query_cache.flush()
+        self.trace_cache.flush()
+        self.rules_cache.flush()
 
     def arranger(self, changes: Path) -> AffixArranger:
         return arranger_for(changes)
@@ -52,6 +83,15 @@ class Evolver:
     def lexurgy(self, changes: Path) -> LexurgyClient:
         return LexurgyClient.for_changes(changes)
 
+    def start(self, changes: Iterable[Path]) -> None:
+        """
+        Starts a Lexurgy server for each existing changes file in the background.
+        """
+        for path in changes:
+            if path.exists():
+                self.lexurgy(path).start()
+
+    @frozen
     def trace(
         self, forms: Sequence[ResolvedForm], *, changes: Path
     ) -> list[EvolvedWithTrace]:
@@ -73,7 +113,7 @@ class Evolver:
         trace_cache: Mapping[Query, list[TraceLine]] = TupleMappingView(
             self.trace_cache, changes
         )
-        if query not in trace_cache:
+        if not trace_cache.get(query):
             return []
         query_trace = (
             query.get_query(TupleMappingView(self.query_cache, changes)),
@@ -89,6 +129,8 @@ class Evolver:
                     + [query_trace]
                 )
 
+    @frozen
+    @timed("evolve")
     def evolve(
         self,
         forms: Sequence[ResolvedForm],
@@ -96,40 +138,48 @@ class Evolver:
         trace: bool = False,
         changes: Path,
     ) -> list[Evolved]:
+        self.refresh(changes)
+
         cache = TupleMappingView(self.query_cache, changes)
         resolved_forms = self.rearrange_forms(forms, changes)
+        record = trace or config().incremental_evolve
+        count("evolve.forms", len(forms))
 
-        mapping, layers = self.batcher.builder(self.arranger(changes)).build_and_order(
-            resolved_forms
-        )
+        with timer("evolve.build"):
+            mapping, layers = self.batcher.builder(
+                self.arranger(changes)
+            ).build_and_order(resolved_forms)
 
         for layer in layers:
-            segments = segment_by_start_end(layer)
-
-            for (start, end), queries in segments.items():
-                new_queries = [
+            new_queries = {
+                segment: [
                     query
                     for query in queries
                     if (changes, query) not in self.query_cache
-                    or (trace and (changes, query) not in self.trace_cache)
+                    or (record and (changes, query) not in self.trace_cache)
                 ]
-
-                words = []
-                for query in new_queries:
-                    word = query.get_query(cache)
-                    words.append(word)
-
-                evolved_forms, trace_lines = self.evolve_words(
-                    words, start=start, end=end, trace=trace, changes=changes
-                )
-
-                for query, evolved in zip(new_queries, evolved_forms):
+                for segment, queries in segment_by_start_end(layer).items()
+            }
+            count("evolve.queries", len(layer))
+            count("evolve.new-queries", sum(map(len, new_queries.values())))
+
+            evolved_segments = self.evolve_segments(
+                {
+                    segment: [query.get_query(cache) for query in queries]
+                    for segment, queries in new_queries.items()
+                },
+                trace=record,
+                changes=changes,
+            )
+
+            for segment, queries in new_queries.items():
+                evolved_forms, trace_lines = evolved_segments[segment]
+                for query, evolved in zip(queries, evolved_forms):
                     self.query_cache[(changes, query)] = evolved
-                    if trace:
-                        if evolved.proto in trace_lines:
-                            self.trace_cache[(changes, query)] = trace_lines[
-                                evolved.proto
-                            ]
+                    if record:
+                        self.trace_cache[(changes, query)] = trace_lines.get(
+                            evolved.proto, []
+                        )
 
         result: list[Evolved] = []
 
@@ -140,6 +190,141 @@ class Evolver:
 
         return result
 
+    @timed("evolve.refresh")
+    def refresh(self, changes: Path) -> None:
+        """
+        Keeps the cached evolutions that are unaffected by edits to the sound changes,
+        and re-evolves the rest from the first changed rule when possible.
+        """
+        partition = str(changes)
+        stale = self.query_cache.stale(partition)
+        if not stale and changes in self.rules_cache:
+            return
+
+        rules = fingerprint_rules(changes) if changes.exists() else []
+
+        if stale:
+            queries: QueryCache = {}
+            traces: TraceCache = {}
+            if changes in self.rules_cache:
+                queries, traces = self.salvage(
+                    self.query_cache.partition_items(partition),
+                    self.trace_cache.partition_items(partition),
+                    self.rules_cache[changes],
+                    rules,
+                    changes,
+                )
+
+            self.query_cache.replace_partition(partition, queries)
+            self.trace_cache.replace_partition(partition, traces)
+
+        self.rules_cache[changes] = rules
+
+    def salvage(
+        self,
+        queries: QueryCache,
+        traces: TraceCache,
+        old: RuleFingerprints,
+        rules: RuleFingerprints,
+        changes: Path,
+    ) -> tuple[QueryCache, TraceCache]:
+        changed = first_changed_rule(old, rules)
+        if changed is None:
+            return queries, traces
+
+        arranger = self.arranger(changes)
+
+        if (removed := removed_rules(old, rules, changed)) is not None:
+            return self.truncate(queries, traces, removed, arranger)
+
+        if (
+            changed >= len(rules)
+            or arranger.raw_rules.count(rule := rules[changed][0]) != 1
+        ):
+            return {}, {}
+
+        first = arranger.rules[rule]
+        unchanged = set(arranger.raw_rules[:first])
+
+        kept_queries: QueryCache = {}
+        kept_traces: TraceCache = {}
+        resumed: dict[str | None, dict[str, list[tuple[Path, Query]]]] = {}
+
+        for key, evolved in queries.items():
+            query = key[1]
+            if query.start not in arranger.rules or (
+                query.end is not None and query.end not in arranger.rules
+            ):
+                continue
+
+            if query.end is not None and arranger.rules[query.end] <= first:
+                kept_queries[key] = evolved
+                if key in traces:
+                    kept_traces[key] = traces[key]
+
+            elif arranger.rules[query.start] < first and key in traces:
+                before = [line for line in traces[key] if line.rule in unchanged]
+                intermediate = before[-1].after if before else evolved.proto
+                resumed.setdefault(query.end, {})
+                resumed[query.end].setdefault(intermediate, [])
+                resumed[query.end][intermediate].append(key)
+
+        try:
+            evolved_segments = self.evolve_segments(
+                {(rule, end): list(words) for end, words in resumed.items()},
+                trace=True,
+                changes=changes,
+            )
+        except LexurgyError:
+            return kept_queries, kept_traces
+
+        for end, words in resumed.items():
+            evolved_forms, trace_lines = evolved_segments[(rule, end)]
+            for intermediate, evolved in zip(words, evolved_forms):
+                for key in words[intermediate]:
+                    proto = queries[key].proto
+                    kept_queries[key] = replace(evolved, proto=proto)
+                    kept_traces[key] = [
+                        line for line in traces[key] if line.rule in unchanged
+                    ] + [
+                        line.set_word(proto)
+                        for line in trace_lines.get(intermediate, [])
+                    ]
+
+        return kept_queries, kept_traces
+
+    @staticmethod
+    def truncate(
+        queries: QueryCache,
+        traces: TraceCache,
+        removed: list[str],
+        arranger: AffixArranger,
+    ) -> tuple[QueryCache, TraceCache]:
+        """
+        Keeps the evolutions that stop before the removed rules or were untouched by them.
+        """
+        if any(rule in arranger.rules for rule in removed):
+            return {}, {}
+
+        kept_queries: QueryCache = {}
+        kept_traces: TraceCache = {}
+
+        for key, evolved in queries.items():
+            query = key[1]
+            if query.start not in arranger.rules or query.end not in arranger.rules:
+                continue
+
+            if query.end is None and (
+                key not in traces or any(line.rule in removed for line in traces[key])
+            ):
+                continue
+
+            kept_queries[key] = evolved
+            if key in traces:
+                kept_traces[key] = traces[key]
+
+        return kept_queries, kept_traces
+
     def rearrange(self, form: ResolvedForm, changes: Path) -> ResolvedForm:
         return self.arranger(changes).rearrange(form)
 
@@ -156,18 +341,52 @@ class Evolver:
         end: str | None = None,
         trace: bool = False,
         changes: Path,
-    ) -> tuple[list[Evolved], Mapping[str, list[TraceLine]]]:
-        if not words:
-            return [], {}
+    ) -> EvolvedWords:
+        return self.evolve_segments(
+            {(start, end): words}, trace=trace, changes=changes
+        )[(start, end)]
 
-        trace_words = []
-        if trace:
-            trace_words = words
+    def evolve_segments(
+        self,
+        segments: Mapping[Segment, list[str]],
+        *,
+        trace: bool = False,
+        changes: Path,
+    ) -> Mapping[Segment, EvolvedWords]:
+        shards: list[tuple[Segment, list[str]]] = [
+            (segment, shard)
+            for segment, words in segments.items()
+            for shard in shard_words(words, self.lexurgy(changes).size)
+        ]
+
+        responses = self.lexurgy(changes).roundtrip_all(
+            [
+                LexurgyRequest(shard, start, end, shard if trace else [])
+                for (start, end), shard in shards
+            ]
+        )
 
-        request = LexurgyRequest(words, start, end, trace_words)
+        result: dict[Segment, tuple[list[Evolved], dict[str, list[TraceLine]]]] = {
+            segment: ([], {}) for segment in segments
+        }
+        for (segment, shard), response in zip(shards, responses):
+            shard_evolved, shard_trace_lines = self.parse_response(
+                shard, response, trace=trace, changes=changes
+            )
+            result[segment][0].extend(shard_evolved)
+            result[segment][1].update(shard_trace_lines)
 
-        response = self.lexurgy(changes).roundtrip(request)
+        return result
 
+    @staticmethod
+    @timed("evolve.parse-response")
+    def parse_response(
+        words: list[str],
+        response: AnyLexurgyResponse,
+        *,
+        trace: bool,
+        changes: Path,
+    ) -> EvolvedWords:
         match response:
             case LexurgyErrorResponse():
                 raise LexurgyError(response.message)
@@ -203,9 +422,25 @@ class Evolver:
 
                 trace_lines: Mapping[str, list[TraceLine]] = {}
                 if trace:
-                    trace_lines = parse_trace_lines(response.trace_lines, words[0])
+                    with timer("evolve.parse-trace"):
+                        trace_lines = parse_trace_lines(response.trace_lines, words[0])
 
                 return [
                     Evolved(proto, modern, phonetic)
                     for proto, modern, phonetic in zip(words, moderns, phonetics)
                 ], trace_lines
+
+
+def changes_partition(key: tuple[Path, Query]) -> str:
+    return str(key[0])
+
+
+def changes_paths(partition: str) -> list[AnyPath]:
+    return list(traverse_includes(Path(partition)))
+
+
+def shard_words(words: list[str], shards: int) -> list[list[str]]:
+    return [
+        list(shard)
+        for shard in split_evenly(words, min(shards, len(words) // MIN_SHARD_SIZE))
+    ]
@@ -1,21 +1,24 @@
 import re
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 from dataclasses import dataclass
 from functools import cached_property
+from hashlib import md5
 from pathlib import Path
 from typing import Callable, Generic, Self, TypeVar
 
 from .. import CHANGES_GLOB, CHANGES_PATH
 from ..cache import path_cache
 from ..domain import Component, Compound, Joiner, Morpheme, ResolvedForm
+from ..lexurgy.includes import INCLUDE_PATTERN
 
-INCLUDE_PATTERN = r'^#include\s*"(?P<included>[^"]+)"'
 RULE_PATTERN = r"^(?P<rule>[A-Za-z0-9-]+)\s*:"
 
 T = TypeVar("T")
 
 Ranker = Callable[[Joiner], int]
 
+RuleFingerprints = list[tuple[str, bytes]]
+
 
 @dataclass(eq=True, frozen=True)
 class FlatJoin(Generic[T]):
@@ -82,13 +85,70 @@ def traverse_path(path: Path) -> list[str]:
             rules.extend(traverse_path(path.parent / included))
         if (match := re.match(RULE_PATTERN, line.strip())) is not None:
             rule = match.group("rule")
-            if rule.lower() == "syllables" or rule.lower().startswith("romanizer"):
+            if not is_sound_change(rule):
                 continue
             rules.append(match.group("rule"))
 
     return rules
 
 
+def is_sound_change(rule: str) -> bool:
+    return rule.lower() != "syllables" and not rule.lower().startswith("romanizer")
+
+
+def expand_includes(path: Path) -> Iterator[str]:
+    for line in path.read_text().splitlines():
+        if (match := re.match(INCLUDE_PATTERN, line.strip())) is not None:
+            yield from expand_includes(path.parent / match.group("included"))
+        elif line.strip() and not line.strip().startswith("#"):
+            yield line
+
+
+def fingerprint_rules(path: Path) -> RuleFingerprints:
+    """
+    Splits the (include-expanded) changes into blocks, one per rule,
+    preceded by an unnamed block for everything before the first rule.
+    """
+    blocks: list[tuple[str, list[str]]] = [("", [])]
+    for line in expand_includes(path):
+        if (match := re.match(RULE_PATTERN, line.strip())) is not None:
+            blocks.append((match.group("rule"), []))
+        blocks[-1][1].append(line)
+
+    return [(name, md5("\n".join(lines).encode()).digest()) for name, lines in blocks]
+
+
+def first_changed_rule(old: RuleFingerprints, new: RuleFingerprints) -> int | None:
+    for i, (old_block, new_block) in enumerate(zip(old, new)):
+        if old_block != new_block:
+            return i
+
+    if len(old) == len(new):
+        return None
+
+    return min(len(old), len(new))
+
+
+def removed_rules(
+    old: RuleFingerprints, new: RuleFingerprints, changed: int
+) -> list[str] | None:
+    """
+    The sound changes removed from the end (before any romanizers),
+    or None if the rules were changed otherwise.
+    """
+    rest = new[changed:]
+    if len(old) - len(rest) <= changed or old[len(old) - len(rest) :] != rest:
+        return None
+
+    removed = [name for name, _ in old[changed : len(old) - len(rest)]]
+    if not all(name and is_sound_change(name) for name in removed) or any(
+        is_sound_change(name) for name, _ in rest
+    ):
+        return None
+
+    return removed
+
+
 @dataclass
 class AffixArranger:
     raw_rules: list[str]
@@ -118,6 +118,7 @@ class QueryWalker:
 
 
 BatcherCache = dict[ResolvedForm, Query]
+Segment = tuple[str | None, str | None]
 
 
 def order_in_layers(queries: list[Query]) -> list[list[Query]]:
@@ -126,8 +127,8 @@ def order_in_layers(queries: list[Query]) -> list[list[Query]]:
 
 def segment_by_start_end(
     queries: list[Query],
-) -> Mapping[tuple[str | None, str | None], list[Query]]:
-    segments: dict[tuple[str | None, str | None], list[Query]] = {}
+) -> Mapping[Segment, list[Query]]:
+    segments: dict[Segment, list[Query]] = {}
 
     for query in queries:
         start_end = query.start, query.end
@@ -1,12 +1,16 @@
-from collections.abc import Iterable
+import os
+from collections.abc import Iterable, Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, replace
 from functools import cached_property
 from itertools import chain
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Self
+from typing import Self, TypeVar
 
 from .. import CHANGES_PATH, LEXICON_PATH
-from ..config import config, config_scope_as
+from ..checksum import checksum
+from ..config import Config, config, config_as, config_scope_as
 from ..domain import (
     Affix,
     Component,
@@ -31,6 +35,7 @@ from ..domain import (
     Suffix,
 )
 from ..parser import continue_lines
+from ..profile import count, timed
 from .domain import (
     AffixDefinition,
     Entry,
@@ -40,7 +45,14 @@ from .domain import (
     VarFusion,
 )
 from .errors import MissingAffix, MissingLexeme, MissingTemplate, UnexpectedRecord
-from .parser import parse_lexicon
+from .parser import LexiconLine, parse_lexicon
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+ParseCache = MutableMapping[tuple[bytes, str], list[LexiconLine]]
+
+PARALLEL_SIZE = 256 * 1024
 
 
 @dataclass
@@ -51,8 +63,10 @@ class Lexicon:
     scopes: set[ScopeDefinition]
 
     @classmethod
-    def from_path(cls, path: Path = LEXICON_PATH) -> Self:
-        return cls.from_iterable(cls.resolve_path(path, Path()))
+    def from_path(
+        cls, path: Path = LEXICON_PATH, cache: ParseCache | None = None
+    ) -> Self:
+        return cls.from_iterable(cls.resolve_path(path, Path(), cache))
 
     @classmethod
     def from_string(cls, string: str, parent: Path = Path()) -> Self:
@@ -98,19 +112,66 @@ class Lexicon:
 
     @classmethod
     def resolve_path(
-        cls, path: Path, parent: Path
+        cls, path: Path, parent: Path, cache: ParseCache | None = None
     ) -> Iterable[Entry | AffixDefinition | Template | ScopeDefinition]:
         path = cls.resolve_if_relative(path, parent)
-        file_scope = config().scope
-        if path.stem.startswith("%"):
-            file_scope = path.stem[1:]
-        with config_scope_as(file_scope):
-            return list(
-                cls.resolve_paths(
-                    parse_lexicon(continue_lines(path.read_text().splitlines())),
-                    path.parent,
-                )
-            )
+        key = (path, file_scope(path, config().scope))
+        return list(cls.expand_file(key, cls.parse_files(key, cache)))
+
+    @classmethod
+    @timed("lexicon.parse")
+    def parse_files(
+        cls, root: tuple[Path, str], cache: ParseCache | None = None
+    ) -> dict[tuple[Path, str], list[LexiconLine]]:
+        """
+        Parses the file and everything it includes, one level of includes at a time.
+        Files whose checksum and scope are in the cache are not parsed again,
+        and the cache is left with only the files of this lexicon.
+        """
+        cache = {} if cache is None else cache
+        parsed: dict[tuple[Path, str], list[LexiconLine]] = {}
+        used: set[tuple[bytes, str]] = set()
+        pending = [root]
+
+        while pending:
+            keys = {key: (checksum(key[0]), key[1]) for key in pending}
+            missing = [key for key in pending if keys[key] not in cache]
+            count("lexicon.parsed-files", len(missing))
+            for key, lines in zip(missing, parse_batch(missing)):
+                cache[keys[key]] = lines
+
+            included = []
+            for key in pending:
+                used.add(keys[key])
+                parsed[key] = cache[keys[key]]
+                for line in parsed[key]:
+                    if isinstance(line, Path):
+                        path = cls.resolve_if_relative(line, key[0].parent)
+                        included.append((path, file_scope(path, key[1])))
+
+            pending = [key for key in dict.fromkeys(included) if key not in parsed]
+
+        for cached in [cached for cached in cache if cached not in used]:
+            del cache[cached]
+
+        return parsed
+
+    @classmethod
+    def expand_file(
+        cls,
+        key: tuple[Path, str],
+        parsed: Mapping[tuple[Path, str], list[LexiconLine]],
+    ) -> Iterable[Entry | AffixDefinition | Template | ScopeDefinition]:
+        path, scope = key
+        for line in parsed[key]:
+            match line:
+                case Path():
+                    included = cls.resolve_if_relative(line, path.parent)
+                    yield from cls.expand_file(
+                        (included, file_scope(included, scope)), parsed
+                    )
+                case _:
+                    yield line
 
     @classmethod
     def from_iterable(
@@ -152,16 +213,28 @@ class Lexicon:
 
         return mapping
 
+    @cached_property
+    def inherited_entries(self) -> dict[Scope, dict[LexemeFusion, Entry]]:
+        return {}
+
+    def entries_in(self, scope: Scope) -> dict[LexemeFusion, Entry]:
+        """
+        The entries visible from the scope, including those inherited from its parents.
+        """
+        if scope not in self.inherited_entries:
+            self.inherited_entries[scope] = inherit(
+                self.entry_mapping, self.scope_chain(scope)
+            )
+
+        return self.inherited_entries[scope]
+
     def get_entry(self, lexeme: Lexeme, scope: Scope = Scope()) -> Entry:
+        entries = self.entries_in(scope)
         fusion = Fusion(lexeme)
-        if scope in self.entry_mapping and fusion in self.entry_mapping[scope]:
-            return self.entry_mapping[scope][fusion]
+        if fusion not in entries:
+            raise MissingLexeme(f"{lexeme.name} in {self.scope_chain(scope)[-1]}")
 
-        parent = self.parent(scope)
-        if scope == parent:
-            raise MissingLexeme(f"{lexeme.name} in {scope}")
-        else:
-            return self.get_entry(lexeme, parent)
+        return entries[fusion]
 
     @cached_property
     def affix_mapping(self) -> dict[Scope, dict[Affix, AffixDefinition]]:
@@ -173,22 +246,50 @@ class Lexicon:
 
         return mapping
 
+    @cached_property
+    def inherited_affixes(self) -> dict[Scope, dict[Affix, AffixDefinition]]:
+        return {}
+
+    def affixes_in(self, scope: Scope) -> dict[Affix, AffixDefinition]:
+        if scope not in self.inherited_affixes:
+            self.inherited_affixes[scope] = inherit(
+                self.affix_mapping, self.scope_chain(scope)
+            )
+
+        return self.inherited_affixes[scope]
+
     def get_affix(self, affix: Affix, scope: Scope = Scope()) -> AffixDefinition:
-        if scope in self.affix_mapping and affix in self.affix_mapping[scope]:
-            return self.affix_mapping[scope][affix]
+        affixes = self.affixes_in(scope)
+        if affix not in affixes:
+            raise MissingAffix(f"{affix.name} in {self.scope_chain(scope)[-1]}")
 
-        parent = self.parent(scope)
-        if scope == parent:
-            raise MissingAffix(f"{affix.name} in {scope}")
-        else:
-            return self.get_affix(affix, parent)
+        return affixes[affix]
+
+    @cached_property
+    def resolved_words(self) -> dict[tuple[DefaultWord, Scope], ResolvedForm]:
+        return {}
+
+    @cached_property
+    def resolved_fusions(self) -> dict[tuple[DefaultFusion, Scope], ResolvedForm]:
+        return {}
+
+    @cached_property
+    def resolved_affixes(
+        self,
+    ) -> dict[tuple[Affix, Scope], tuple[AffixDefinition, ResolvedForm | None]]:
+        return {}
 
     def resolve(self, word: DefaultWord, scope: Scope = Scope()) -> ResolvedForm:
-        match word:
-            case Component():
-                return self.resolve_fusion(word.form, scope)
-            case Compound():
-                return self.resolve_compound(word, scope)
+        key = (word, scope)
+        if key not in self.resolved_words:
+            match word:
+                case Component():
+                    resolved = self.resolve_fusion(word.form, scope)
+                case Compound():
+                    resolved = self.resolve_compound(word, scope)
+            self.resolved_words[key] = resolved
+
+        return self.resolved_words[key]
 
     def resolve_any(
         self,
@@ -237,6 +338,15 @@ class Lexicon:
 
     def resolve_fusion(
         self, fusion: DefaultFusion, scope: Scope = Scope()
+    ) -> ResolvedForm:
+        key = (fusion, scope)
+        if key not in self.resolved_fusions:
+            self.resolved_fusions[key] = self.resolve_fusion_uncached(fusion, scope)
+
+        return self.resolved_fusions[key]
+
+    def resolve_fusion_uncached(
+        self, fusion: DefaultFusion, scope: Scope
     ) -> ResolvedForm:
         prefixes = len(fusion.prefixes)
         suffixes = len(fusion.suffixes)
@@ -291,21 +401,33 @@ class Lexicon:
 
         return form
 
+    def resolve_affix(
+        self, affix: Affix, scope: Scope
+    ) -> tuple[AffixDefinition, ResolvedForm | None]:
+        key = (affix, scope)
+        if key not in self.resolved_affixes:
+            definition = self.get_affix(affix, scope)
+            resolved_form = None
+            if not definition.is_var():
+                definition_form = definition.get_form()
+                resolved_form = self.resolve(
+                    definition_form.scoped, definition_form.scope or scope
+                )
+            self.resolved_affixes[key] = (definition, resolved_form)
+
+        return self.resolved_affixes[key]
+
     def extend_with_affix(
         self, form: ResolvedForm, affix: Affix, scope: Scope = Scope()
     ) -> ResolvedForm:
-        definition = self.get_affix(affix, scope)
-        if definition.is_var():
+        definition, resolved_form = self.resolve_affix(affix, scope)
+        if resolved_form is None:
             return self.extend_with_affixes(
                 form,
                 scope,
                 *definition.get_var().affixes(),
             )
         else:
-            definition_form = definition.get_form()
-            resolved_form = self.resolve(
-                definition_form.scoped, definition_form.scope or scope
-            )
             match definition.affix:
                 case Prefix():
                     if definition.stressed:
@@ -334,15 +456,75 @@ class Lexicon:
                             resolved_form,
                         )
 
-    def get_vars(self, name: TemplateName | None) -> tuple[VarFusion, ...]:
+    @cached_property
+    def template_mapping(self) -> dict[Scope, dict[TemplateName, Template]]:
+        mapping = dict[Scope, dict[TemplateName, Template]]()
+        for template in self.templates:
+            scope = template.tags.scope
+            mapping.setdefault(scope, {})
+            mapping[scope][template.name] = template
+
+        return mapping
+
+    @cached_property
+    def inherited_templates(self) -> dict[Scope, dict[TemplateName, Template]]:
+        return {}
+
+    def templates_in(self, scope: Scope) -> dict[TemplateName, Template]:
+        if scope not in self.inherited_templates:
+            self.inherited_templates[scope] = inherit(
+                self.template_mapping, self.scope_chain(scope)
+            )
+
+        return self.inherited_templates[scope]
+
+    @cached_property
+    def template_names(self) -> dict[TemplateName, Template]:
+        return {template.name: template for template in self.templates}
+
+    def get_template(self, name: TemplateName, scope: Scope | None = None) -> Template:
+        """
+        Prefers templates visible from the scope, then falls back to any scope.
+        """
+        if scope is not None and name in self.templates_in(scope):
+            return self.templates_in(scope)[name]
+
+        if name not in self.template_names:
+            raise MissingTemplate(name.name)
+
+        return self.template_names[name]
+
+    def get_vars(
+        self, name: TemplateName | None, scope: Scope | None = None
+    ) -> tuple[VarFusion, ...]:
         if name is None:
             return (VarFusion("$", (), ()),)
         else:
-            for template in self.templates:
-                if template.name == name:
-                    return template.vars
+            return self.get_template(name, scope).vars
 
-            raise MissingTemplate(name.name)
+    @cached_property
+    def var_forms(
+        self,
+    ) -> dict[tuple[TemplateName | None, Scope | None], tuple[tuple[str, str], ...]]:
+        return {}
+
+    def get_var_forms(
+        self, name: TemplateName | None, scope: Scope | None = None
+    ) -> tuple[tuple[str, str], ...]:
+        """
+        The prefixes and suffixes to put around a stem for each var of the template.
+        """
+        key = (name, scope)
+        if key not in self.var_forms:
+            self.var_forms[key] = tuple(
+                (
+                    "".join(map(str, reversed(var.prefixes))),
+                    "".join(map(str, var.suffixes)),
+                )
+                for var in self.get_vars(name, scope)
+            )
+
+        return self.var_forms[key]
 
     def form(self, record: Definable, scope: Scope = Scope()) -> Scoped[DefaultWord]:
         match record.scoped:
@@ -421,5 +603,58 @@ class Lexicon:
     def parent(self, scope: Scope) -> Scope:
         return self.parents.get(scope, Scope())
 
+    def scope_chain(self, scope: Scope) -> list[Scope]:
+        chain = [scope]
+        while (parent := self.parent(chain[-1])) not in chain:
+            chain.append(parent)
+
+        return chain
+
     def changes_for(self, scope: Scope) -> Path:
         return self.changes.get(scope, CHANGES_PATH)
+
+
+def inherit(
+    mapping: Mapping[Scope, Mapping[_K, _V]], scopes: list[Scope]
+) -> dict[_K, _V]:
+    inherited: dict[_K, _V] = {}
+    for scope in reversed(scopes):
+        inherited.update(mapping.get(scope, {}))
+
+    return inherited
+
+
+def file_scope(path: Path, scope: str) -> str:
+    if path.stem.startswith("%"):
+        return path.stem[1:]
+
+    return scope
+
+
+def parse_file(path: Path, scope: str) -> list[LexiconLine]:
+    with config_scope_as(scope):
+        return list(parse_lexicon(continue_lines(path.read_text().splitlines())))
+
+
+def parse_batch(keys: list[tuple[Path, str]]) -> list[list[LexiconLine]]:
+    """
+    Parses large batches of files in worker processes.
+    """
+    if len(keys) < 2 or sum(path.stat().st_size for path, _ in keys) < PARALLEL_SIZE:
+        return [parse_file(path, scope) for path, scope in keys]
+
+    with ProcessPoolExecutor(
+        min(len(keys), os.cpu_count() or 1), get_context("spawn")
+    ) as executor:
+        return list(
+            executor.map(
+                parse_file_as,
+                [replace(config()) for _key in keys],
+                *zip(*keys),
+            )
+        )
+
+
+def parse_file_as(settings: Config, path: Path, scope: str) -> list[LexiconLine]:
+    with config_as(settings):
+        return parse_file(path, scope)
@@ -1,8 +1,10 @@
+import re
 from collections.abc import Iterable
 from pathlib import Path
 from typing import Literal, cast
 
 from pyrsercomb import (
+    PyrsercombError,
     default,
     eof,
     eol,
@@ -40,15 +42,40 @@ from .domain import (
     VarFusion,
 )
 
+LexiconLine = Entry | AffixDefinition | Template | ScopeDefinition | Path
+
+IGNORED_LINE = re.compile(r"\s*(#.*)?")
+
 
 def parse_lexicon(
     lines: Iterable[str],
-) -> Iterable[Entry | AffixDefinition | Template | ScopeDefinition | Path]:
-    return [
-        parsed_line
-        for line in lines
-        if (parsed_line := lexicon_line.parse_or_raise(line))
-    ]
+) -> Iterable[LexiconLine]:
+    return [parsed_line for line in lines if (parsed_line := parse_lexicon_line(line))]
+
+
+def parse_lexicon_line(line: str) -> LexiconLine | None:
+    """
+    Skips blank and comment lines, and only runs the parser for the line's keyword.
+    Anything that fails is parsed again with lexicon_line, to raise the same errors.
+    """
+    if IGNORED_LINE.fullmatch(line):
+        return None
+
+    try:
+        if line.startswith("entry"):
+            return entry_line.parse_or_raise(line)
+        if line.startswith("affix"):
+            return affix_definition_line.parse_or_raise(line)
+        if line.startswith("template"):
+            return template_line.parse_or_raise(line)
+        if line.startswith("scope"):
+            return scope_definition_line.parse_or_raise(line)
+        if line.startswith("include"):
+            return include_line.parse_or_raise(line)
+    except PyrsercombError:
+        pass
+
+    return lexicon_line.parse_or_raise(line)
 
 
 var_symbol = string("$")[lambda _: cast(Literal["$"], "$")]
@@ -130,6 +157,12 @@ meaningful_segment = record | include
 
 comment = regex(r"\s*#.*")
 
-lexicon_line = (
-    (meaningful_segment | whitespace()[lambda _: None]) << -comment << (eol() ^ eof())
-)
+line_end = -comment << (eol() ^ eof())
+
+lexicon_line = (meaningful_segment | whitespace()[lambda _: None]) << line_end
+
+entry_line = entry << line_end
+affix_definition_line = affix_definition << line_end
+template_line = template << line_end
+scope_definition_line = scope_definition << line_end
+include_line = include << line_end
@@ -1,66 +1,393 @@
+import atexit
+import os
+import weakref
+from collections.abc import Generator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from dataclasses import dataclass, field
 from functools import cache, cached_property
+from itertools import chain
 from pathlib import Path
-from subprocess import PIPE, Popen
-from threading import RLock
-from typing import IO, Self
+from queue import Queue
+from subprocess import PIPE, Popen, TimeoutExpired
+from threading import Lock, RLock, Thread
+from time import monotonic, sleep
+from typing import Self, TypeVar
 
-from .. import CHANGES_GLOB, CHANGES_PATH, PYCONLANG_PATH
+from .. import CHANGES_PATH, PYCONLANG_PATH
 from ..assets import LEXURGY_VERSION
-from ..cache import path_cached_property
+from ..cache import AnyPath, PathCachedFunc, file_monitor
+from ..config import config
+from ..profile import count, timed
+from .coalesce import Coalescer
 from .domain import AnyLexurgyResponse, LexurgyRequest, parse_response
+from .includes import traverse_includes
+
+_T = TypeVar("_T")
 
 LEXURGY_PATH = PYCONLANG_PATH / f"lexurgy-{LEXURGY_VERSION}" / "bin" / "lexurgy"
+IDLE_REAPER_INTERVAL = 5.0
 
 
 @dataclass
-class LexurgyClient:
-    changes: Path = field(default=CHANGES_PATH)
+class LexurgyProcesses:
+    """
+    Every running Lexurgy process, so that replaced ones are shut down
+    and none outlive the interpreter.
+    Lexurgy reads its changes only at startup, so new rules always take a new process.
+    """
 
-    @classmethod
-    @cache
-    def for_changes(cls, changes: Path) -> Self:
-        return cls(changes)
+    processes: set[Popen[str]] = field(default_factory=set)
+    servers: list[weakref.ref["LexurgyServer"]] = field(default_factory=list)
+    reaper: Thread | None = None
+    lock: Lock = field(default_factory=Lock)
 
-    @path_cached_property(CHANGES_PATH, CHANGES_GLOB)
-    def popen(self) -> Popen[str]:
+    def spawn(self, changes: Path) -> Popen[str]:
         args = [
             "sh",
             str(LEXURGY_PATH),
             "server",
-            str(self.changes),
+            str(changes),
         ]
-        return Popen(args, stdin=PIPE, stdout=PIPE, text=True, bufsize=1)
+        env = None
+        if config().lexurgy_heap:
+            java_opts = os.environ.get("JAVA_OPTS", "")
+            env = os.environ | {
+                "JAVA_OPTS": f"{java_opts} -Xmx{config().lexurgy_heap}".strip()
+            }
+        popen = Popen(args, stdin=PIPE, stdout=PIPE, text=True, bufsize=1, env=env)
+        with self.lock:
+            self.processes.add(popen)
+        count("lexurgy.spawned")
+        self.start_reaper()
+        return popen
+
+    def retire(self, popen: Popen[str]) -> None:
+        """
+        Stops the process in the background, after any request it is answering.
+        """
+        count("lexurgy.retired")
+        Thread(target=self.stop, args=(popen,), daemon=True).start()
+
+    def stop(self, popen: Popen[str], timeout: float = 5.0) -> None:
+        if popen.stdin is not None:
+            with suppress(OSError):
+                popen.stdin.close()
+
+        try:
+            popen.wait(timeout / 5)
+        except TimeoutExpired:
+            popen.terminate()
+            try:
+                popen.wait(timeout)
+            except TimeoutExpired:
+                popen.kill()
+                popen.wait()
+
+        with self.lock:
+            self.processes.discard(popen)
+
+    def stop_all(self) -> None:
+        with self.lock:
+            processes = list(self.processes)
+
+        for popen in processes:
+            popen.terminate()
+        for popen in processes:
+            self.stop(popen, 1.0)
+
+    def live(self) -> int:
+        with self.lock:
+            return sum(popen.poll() is None for popen in self.processes)
+
+    def watch(self, server: "LexurgyServer") -> None:
+        """
+        Lets the reaper stop the server's process once it has been idle
+        for `lexurgy_idle_timeout`.
+        """
+        with self.lock:
+            self.servers.append(weakref.ref(server))
+
+    def start_reaper(self) -> None:
+        """
+        Starts the reaper thread with the first process spawned under a timeout.
+        """
+        if config().lexurgy_idle_timeout <= 0:
+            return
+
+        with self.lock:
+            if self.reaper is None:
+                self.reaper = Thread(target=self.reap_forever, daemon=True)
+                self.reaper.start()
+
+    def reap_forever(self) -> None:
+        while True:
+            timeout = config().lexurgy_idle_timeout
+            if timeout <= 0:
+                sleep(IDLE_REAPER_INTERVAL)
+                continue
+
+            sleep(min(max(timeout / 4, 0.1), IDLE_REAPER_INTERVAL))
+            self.reap(timeout)
+
+    def reap(self, timeout: float) -> None:
+        with self.lock:
+            self.servers = [ref for ref in self.servers if ref() is not None]
+            servers = [server for ref in self.servers if (server := ref()) is not None]
+
+        for server in servers:
+            server.stop_if_idle(timeout)
+
+
+@cache
+def lexurgy_processes() -> LexurgyProcesses:
+    processes = LexurgyProcesses()
+    atexit.register(processes.stop_all)
+    return processes
+
+
+def retire(popen: Popen[str]) -> None:
+    lexurgy_processes().retire(popen)
+
+
+@dataclass
+class LexurgyServer:
+    """
+    Every use of `popen` holds the lock,
+    so a process is only retired once its requests are answered.
+    """
+
+    changes: Path
+    last_used: float | None = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        lexurgy_processes().watch(self)
+
+    @cached_property
+    def processes(self) -> PathCachedFunc[[], Popen[str]]:
+        return PathCachedFunc(
+            self.watched_paths(),
+            self.spawn,
+            name="LexurgyServer.popen",
+            dispose=retire,
+        )
+
+    @property
+    def popen(self) -> Popen[str]:
+        """
+        Only the changes file and its includes are watched,
+        so editing the changes of another scope keeps this process.
+        """
+        if not self.processes.up_to_date():
+            with self.lock:
+                self.processes.paths = self.watched_paths()
+
+        return self.processes()
+
+    def watched_paths(self) -> list[AnyPath]:
+        return list(traverse_includes(self.changes))
+
+    @timed("lexurgy.spawn")
+    def spawn(self) -> Popen[str]:
+        return lexurgy_processes().spawn(self.changes)
+
+    def stop_if_idle(self, timeout: float) -> None:
+        """
+        Retires the process if it has not been used for `timeout` seconds;
+        the next request spawns a new one.
+        """
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if self.last_used is not None and monotonic() - self.last_used > timeout:
+                self.processes.clear()
+                self.last_used = None
+                count("lexurgy.reaped")
+        finally:
+            self.lock.release()
 
     @cached_property
     def lock(self) -> RLock:
         return RLock()
 
-    @property
-    def stdin(self) -> IO[str]:
-        assert self.popen.stdin is not None
-        return self.popen.stdin
+    @contextmanager
+    def process(self) -> Generator[Popen[str], None, None]:
+        """
+        Retires the process if its use fails,
+        since the protocol can't match responses to requests once they are out of step.
+        """
+        with self.lock:
+            try:
+                yield self.popen
+            except BaseException:
+                self.processes.clear()
+                raise
+            finally:
+                self.last_used = monotonic()
 
-    @property
-    def stdout(self) -> IO[str]:
-        assert self.popen.stdout is not None
-        return self.popen.stdout
+    @staticmethod
+    def send(popen: Popen[str], request: LexurgyRequest) -> None:
+        assert popen.stdin is not None
+        popen.stdin.write(f"{request.to_json()}\n")
+
+    @staticmethod
+    def receive(popen: Popen[str]) -> AnyLexurgyResponse:
+        assert popen.stdout is not None
+        return parse_response(popen.stdout.readline())
+
+    def send_all(
+        self,
+        popen: Popen[str],
+        requests: Sequence[LexurgyRequest],
+        failures: list[BaseException],
+    ) -> None:
+        """
+        Kills the process if a request can't be written, so the reader stops waiting.
+        """
+        try:
+            for request in requests:
+                self.send(popen, request)
+        except BaseException as error:
+            failures.append(error)
+            popen.kill()
+
+    def roundtrip(self, request: LexurgyRequest) -> AnyLexurgyResponse:
+        with self.process() as popen:
+            self.send(popen, request)
+            return self.receive(popen)
+
+    def pipeline(self, requests: Sequence[LexurgyRequest]) -> list[AnyLexurgyResponse]:
+        if len(requests) == 1:
+            return [self.roundtrip(requests[0])]
 
-    def write_line(self, line: str) -> None:
-        self.stdin.write(f"{line}\n")
+        with self.process() as popen:
+            failures: list[BaseException] = []
+            writer = Thread(target=self.send_all, args=(popen, requests, failures))
+            writer.start()
+            try:
+                responses = [self.receive(popen) for _request in requests]
+            except BaseException:
+                written = not failures
+                popen.kill()  # unblocks the writer
+                writer.join()
+                if not written:
+                    raise failures[0]
+                raise
 
-    def read_line(self) -> str:
-        return self.stdout.readline()
+            writer.join()
+            if failures:
+                raise failures[0]
 
-    def send(self, request: LexurgyRequest) -> None:
-        self.write_line(request.to_json())
+            return responses
+
+
+@dataclass
+class LexurgyClient:
+    changes: Path = field(default=CHANGES_PATH)
+    size: int = field(default_factory=lambda: config().lexurgy_servers)
 
-    def receive(self) -> AnyLexurgyResponse:
-        return parse_response(self.read_line())
+    @classmethod
+    @cache
+    def for_changes(cls, changes: Path) -> Self:
+        return cls(changes)
+
+    @cached_property
+    def lock(self) -> RLock:
+        return RLock()
+
+    @cached_property
+    def servers(self) -> list[LexurgyServer]:
+        return []
 
+    @cached_property
+    def idle(self) -> Queue[LexurgyServer]:
+        return Queue()
+
+    def spawn(self) -> None:
+        self.servers.append(LexurgyServer(self.changes))
+        self.idle.put(self.servers[-1])
+
+    def start(self) -> None:
+        """
+        Spawns the first server without waiting for it to be ready,
+        so the JVM boots while the caller does other work.
+        The pool grows to `size` only as requests need it.
+        """
+        with self.lock:
+            if not self.servers:
+                self.spawn()
+            server = self.servers[0]
+
+        with server.process():
+            pass
+
+    @contextmanager
+    def server(self) -> Generator[LexurgyServer, None, None]:
+        with self.lock:
+            if self.idle.empty() and len(self.servers) < max(1, self.size):
+                self.spawn()
+
+        server = self.idle.get()
+        try:
+            yield server
+        finally:
+            self.idle.put(server)
+
+    @timed("lexurgy.roundtrip")
     def roundtrip(self, request: LexurgyRequest) -> AnyLexurgyResponse:
-        self.lock.acquire()
-        self.send(request)
-        response = self.receive()
-        self.lock.release()
-        return response
+        count("lexurgy.requests")
+        count("lexurgy.words", len(request.words))
+        with self.server() as server:
+            return server.roundtrip(request)
+
+    @timed("lexurgy.roundtrip")
+    def pipeline(self, requests: Sequence[LexurgyRequest]) -> list[AnyLexurgyResponse]:
+        count("lexurgy.requests", len(requests))
+        count("lexurgy.words", sum(len(request.words) for request in requests))
+        with self.server() as server:
+            return server.pipeline(requests)
+
+    @cached_property
+    def coalescer(self) -> Coalescer:
+        return Coalescer(self.distribute, config().lexurgy_coalesce_window)
+
+    def roundtrip_all(
+        self, requests: Sequence[LexurgyRequest]
+    ) -> list[AnyLexurgyResponse]:
+        """
+        With `lexurgy_coalesce`, requests from concurrent calls are merged,
+        except for traced ones.
+        """
+        if not requests:
+            return []
+
+        if config().lexurgy_coalesce and not any(
+            request.trace_words for request in requests
+        ):
+            return self.coalescer.roundtrip_all(requests)
+
+        return self.distribute(requests)
+
+    def distribute(
+        self, requests: Sequence[LexurgyRequest]
+    ) -> list[AnyLexurgyResponse]:
+        if not requests:
+            return []
+
+        groups = split_evenly(requests, self.size)
+
+        if len(groups) == 1:
+            return self.pipeline(groups[0])
+
+        with ThreadPoolExecutor(len(groups)) as executor:
+            return list(
+                chain(*executor.map(file_monitor().share(self.pipeline), groups))
+            )
+
+
+def split_evenly(items: Sequence[_T], parts: int) -> list[Sequence[_T]]:
+    if not items:
+        return []
+
+    size = -(-len(items) // max(1, parts))
+    return [items[i : i + size] for i in range(0, len(items), size)]
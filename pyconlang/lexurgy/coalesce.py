@@ -0,0 +1,143 @@
+from collections import Counter
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+from time import sleep
+
+from ..cache import file_monitor
+from ..profile import count
+from .domain import AnyLexurgyResponse, LexurgyRequest, LexurgyResponse
+
+Send = Callable[[Sequence[LexurgyRequest]], list[AnyLexurgyResponse]]
+BatchKey = tuple[str | None, str | None, bool, int]
+
+
+@dataclass
+class Pending:
+    request: LexurgyRequest
+    future: Future[AnyLexurgyResponse] = field(default_factory=Future)
+
+
+@dataclass
+class Coalescer:
+    """
+    Merges the requests of concurrent callers that share a segment into one
+    request, sent once the previous batch is answered (and `window` seconds have passed).
+    The n-th request of a segment in a call is only merged with the n-th of the
+    others, so that a caller's shards still go to separate servers.
+    """
+
+    send: Send
+    window: float = 0.0
+    pending: dict[BatchKey, list[Pending]] = field(default_factory=dict)
+    flushing: bool = False
+    lock: Lock = field(default_factory=Lock)
+
+    def roundtrip_all(
+        self, requests: Sequence[LexurgyRequest]
+    ) -> list[AnyLexurgyResponse]:
+        pendings = [Pending(request) for request in requests]
+        segments: Counter[tuple[str | None, str | None, bool]] = Counter()
+
+        with self.lock:
+            for pending in pendings:
+                segment = (
+                    pending.request.start_at,
+                    pending.request.stop_before,
+                    pending.request.romanize,
+                )
+                self.pending.setdefault((*segment, segments[segment]), []).append(
+                    pending
+                )
+                segments[segment] += 1
+
+            start = not self.flushing
+            self.flushing = True
+
+        if start:
+            Thread(target=file_monitor().share(self.flush_all), daemon=True).start()
+
+        return [pending.future.result() for pending in pendings]
+
+    def flush_all(self) -> None:
+        batches: list[list[Pending]] = []
+        try:
+            while True:
+                if self.window > 0:
+                    sleep(self.window)
+
+                with self.lock:
+                    batches, self.pending = list(self.pending.values()), {}
+                    if not batches:
+                        self.flushing = False
+                        return
+
+                self.flush(batches)
+        except BaseException as e:
+            # no caller may be left waiting, and the next one must start a flush again
+            with self.lock:
+                batches += self.pending.values()
+                self.pending = {}
+                self.flushing = False
+            fail(batches, e)
+            raise
+
+    def flush(self, batches: list[list[Pending]]) -> None:
+        count("lexurgy.coalesced", sum(map(len, batches)) - len(batches))
+        try:
+            responses = self.send([merge(batch) for batch in batches])
+            for batch, response in zip(batches, responses):
+                self.fan_out(batch, response)
+        except Exception as e:
+            fail(batches, e)
+
+    def fan_out(self, batch: list[Pending], response: AnyLexurgyResponse) -> None:
+        if len(batch) == 1:
+            batch[0].future.set_result(response)
+            return
+
+        if not isinstance(response, LexurgyResponse):
+            # resend separately, so that only the caller with the bad word fails
+            try:
+                responses = self.send([pending.request for pending in batch])
+            except Exception as e:
+                fail([batch], e)
+                return
+            for pending, separate in zip(batch, responses):
+                pending.future.set_result(separate)
+            return
+
+        offset = 0
+        for pending in batch:
+            end = offset + len(pending.request.words)
+            pending.future.set_result(
+                LexurgyResponse(
+                    response.words[offset:end],
+                    {
+                        name: words[offset:end]
+                        for name, words in response.intermediates.items()
+                    },
+                )
+            )
+            offset = end
+
+
+def fail(batches: list[list[Pending]], error: BaseException) -> None:
+    for batch in batches:
+        for pending in batch:
+            if not pending.future.done():
+                pending.future.set_exception(error)
+
+
+def merge(batch: list[Pending]) -> LexurgyRequest:
+    if len(batch) == 1:
+        return batch[0].request
+
+    first = batch[0].request
+    return LexurgyRequest(
+        [word for pending in batch for word in pending.request.words],
+        first.start_at,
+        first.stop_before,
+        romanize=first.romanize,
+    )
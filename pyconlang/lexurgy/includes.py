@@ -0,0 +1,23 @@
+import re
+from pathlib import Path
+
+INCLUDE_PATTERN = r'^#include\s*"(?P<included>[^"]+)"'
+
+
+def traverse_includes(path: Path) -> list[Path]:
+    paths: list[Path] = []
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        if current in paths:
+            continue
+
+        paths.append(current)
+        if not current.exists():
+            continue
+
+        for line in current.read_text().splitlines():
+            if (match := re.match(INCLUDE_PATTERN, line.strip())) is not None:
+                pending.append(current.parent / match.group("included"))
+
+    return paths
@@ -0,0 +1,174 @@
+import json
+from collections import Counter
+from collections.abc import Callable, Generator, Mapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import cache, wraps
+from pathlib import Path
+from threading import Lock, local
+from time import perf_counter
+from typing import Any, ParamSpec, TypeVar
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    own_seconds: float = 0.0
+
+
+@dataclass
+class Frame:
+    stage: str
+    start: float
+    children: float = 0.0
+
+
+@dataclass
+class Profile:
+    """
+    Timers and counters for the pipeline stages, recorded only while enabled.
+    A stage's own time excludes the stages it runs in the same thread,
+    and a stage re-entered while running is timed once, by the outermost call.
+    """
+
+    enabled: bool = False
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    counters: Counter[str] = field(default_factory=Counter)
+    lock: Lock = field(default_factory=Lock)
+    state: local = field(default_factory=local)
+
+    @property
+    def frames(self) -> list[Frame]:
+        if not hasattr(self.state, "frames"):
+            self.state.frames = []
+        frames: list[Frame] = self.state.frames
+        return frames
+
+    @contextmanager
+    def timer(self, stage: str) -> Generator[None, None, None]:
+        if not self.enabled or any(frame.stage == stage for frame in self.frames):
+            yield
+            return
+
+        frames = self.frames
+        frames.append(Frame(stage, perf_counter()))
+        try:
+            yield
+        finally:
+            frame = frames.pop()
+            seconds = perf_counter() - frame.start
+            if frames:
+                frames[-1].children += seconds
+            self.record(stage, seconds, seconds - frame.children)
+
+    def record(self, stage: str, seconds: float, own_seconds: float) -> None:
+        with self.lock:
+            stats = self.stages.setdefault(stage, StageStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.own_seconds += own_seconds
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[counter] += amount
+
+    def merge(self, data: Mapping[str, Any]) -> None:
+        """
+        Adds the stats of another profile, as returned by to_dict.
+        """
+        with self.lock:
+            for stage, stats in data.get("stages", {}).items():
+                current = self.stages.setdefault(stage, StageStats())
+                current.calls += stats["calls"]
+                current.seconds += stats["seconds"]
+                current.own_seconds += stats["own_seconds"]
+            self.counters.update(data.get("counters", {}))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "stages": {
+                    stage: asdict(stats) for stage, stats in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    def report(self) -> str:
+        with self.lock:
+            stages = sorted(
+                self.stages.items(), key=lambda item: item[1].seconds, reverse=True
+            )
+            counters = sorted(self.counters.items())
+
+        width = max((len(name) for name, _ in [*stages, *counters]), default=5)
+        lines = [f"{'stage':<{width}} {'calls':>8} {'total':>10} {'own':>10}"]
+        lines += [
+            f"{stage:<{width}} {stats.calls:>8}"
+            f" {stats.seconds:>9.3f}s {stats.own_seconds:>9.3f}s"
+            for stage, stats in stages
+        ]
+
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<{width}} {'count':>8}")
+            lines += [f"{name:<{width}} {value:>8}" for name, value in counters]
+
+        return "\n".join(lines)
+
+
+@cache
+def profile() -> Profile:
+    return Profile()
+
+
+@contextmanager
+def profiling(enabled: bool = True) -> Generator[Profile, None, None]:
+    current = profile()
+    was_enabled = current.enabled
+    if enabled:
+        current.reset()
+        current.enabled = True
+    try:
+        yield current
+    finally:
+        current.enabled = was_enabled
+
+
+@contextmanager
+def timer(stage: str) -> Generator[None, None, None]:
+    with profile().timer(stage):
+        yield
+
+
+def timed(stage: str) -> Callable[[Callable[_P, _T]], Callable[_P, _T]]:
+    def decorator(func: Callable[_P, _T]) -> Callable[_P, _T]:
+        @wraps(func)
+        def wrapped(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+            current = profile()
+            if not current.enabled:
+                return func(*args, **kwargs)
+            with current.timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+def count(counter: str, amount: int = 1) -> None:
+    profile().count(counter, amount)
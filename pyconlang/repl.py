@@ -3,6 +3,7 @@ from collections.abc import Callable, Generator
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from functools import cached_property
+from pathlib import Path
 
 from prompt_toolkit import PromptSession
 from prompt_toolkit.filters import Condition
@@ -16,8 +17,10 @@ from watchdog.observers import Observer
 from . import PYCONLANG_PATH
 from .book import Compiler
 from .book import Handler as BookHandler
+from .cache import cache_registry, file_monitor
 from .config import config
 from .domain import Describable, Scope
+from .lexurgy import lexurgy_processes
 from .strings import center, length
 from .translate import Translator
 
@@ -113,6 +116,22 @@ def lookup(translator: Translator, line: str) -> str:
         )
 
 
+def stats(_translator: Translator, _line: str) -> str:
+    """
+    Shows the hits, misses, invalidations, entries and size of every cache,
+    and the number of running Lexurgy servers.
+    """
+    return (
+        f"{cache_registry().report()}\n\n"
+        f"Lexurgy servers: {lexurgy_processes().live()}"
+    )
+
+
+COMMANDS: dict[str, Callable[[Translator, str], str]] = {
+    ":stats": stats,
+}
+
+
 class Mode(TranslatorAction, Enum):
     NORMAL = (translate,)
     TRACE = (trace,)
@@ -120,6 +139,15 @@ class Mode(TranslatorAction, Enum):
     LOOKUP = (lookup,)
 
 
+def run_line(translator: Translator, line: str, mode: Mode = Mode.NORMAL) -> str:
+    try:
+        action = COMMANDS.get(line.strip(), mode)
+        with file_monitor().frozen():
+            return action(translator, line)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
 class State(Enum):
     INPUT = auto()
     MODE_CHANGING = auto()
@@ -274,16 +302,17 @@ class ReplSession:
         observer.schedule(self.watcher, ".", recursive=True)
         observer.start()
         try:
-            while True:
-                line = self.line(self.session.prompt(f"> "))
+            with file_monitor().observing(Path()):
+                while True:
+                    line = self.line(self.session.prompt(f"> "))
 
-                if self.watcher.changed:
-                    self.watcher.changed = False
+                    if self.watcher.changed:
+                        self.watcher.changed = False
 
-                if not line:
-                    continue
+                    if not line:
+                        continue
 
-                print(self.run_line(line))
+                    print(self.run_line(line))
         except (EOFError, KeyboardInterrupt):
             print("Goodbye.")
             return
@@ -292,10 +321,7 @@ class ReplSession:
             observer.join()
 
     def run_line(self, line: str, mode: Mode | None = None) -> str:
-        try:
-            return (mode or self.mode)(self.translator, line)
-        except Exception as e:
-            return f"{type(e).__name__}: {e}"
+        return run_line(self.translator, line, mode or self.mode)
 
     def line(self, line: str) -> str:
         self.last_line = line or self.last_line
@@ -304,7 +330,7 @@ class ReplSession:
 
 @contextlib.contextmanager
 def create_session() -> Generator[ReplSession, None, None]:
-    with Translator.new() as translator:
+    with Translator.new(eager=True) as translator:
         session = ReplSession(translator, Handler(Compiler(translator)))
         yield session
         session.watcher.join()
@@ -1,10 +1,12 @@
-from collections.abc import Generator, Sequence
+from collections.abc import Generator, Iterable, Mapping, Sequence
 from contextlib import contextmanager
-from dataclasses import dataclass
-from typing import Self
+from dataclasses import dataclass, field
+from typing import Self, cast
 
-from . import LEXICON_GLOB, LEXICON_PATH
-from .cache import path_cached_property
+from pyrsercomb import PyrsercombError
+
+from . import CHANGES_PATH, LEXICON_GLOB, LEXICON_PATH
+from .cache import PersistentDict, frozen, path_cached_property
 from .domain import (
     DefaultSentence,
     DefaultWord,
@@ -14,65 +16,116 @@ from .domain import (
     Scope,
     Sentence,
 )
-from .errors import pass_exception
+from .errors import PyconlangError, pass_exception
 from .evolve import EvolvedWithTrace, Evolver
 from .evolve.domain import Evolved
-from .lexicon import Lexicon
+from .lexicon import Lexicon, ParseCache
+from .lexicon.parser import LexiconLine
 from .parser import parse_definables, parse_sentence
+from .profile import timed
 
 
 @dataclass
 class Translator:
     evolver: Evolver
+    parse_cache: ParseCache = field(default_factory=dict)
+    eager: bool = False
 
     @classmethod
     @contextmanager
-    def new(cls) -> Generator[Self, None, None]:
-        with pass_exception(Evolver.new()) as evolver:
-            yield cls(evolver)
+    def new(cls, eager: bool = False) -> Generator[Self, None, None]:
+        """
+        An eager translator starts the Lexurgy servers before they are needed,
+        so that they boot while the lexicon is parsed.
+        """
+        with pass_exception(Evolver.new()) as evolver, cast(
+            PersistentDict[tuple[bytes, str], list[LexiconLine]],
+            PersistentDict("lexicon-cache", []),
+        ) as parse_cache:
+            if eager:
+                evolver.start([CHANGES_PATH])
+            yield cls(evolver, parse_cache, eager)
 
     @path_cached_property(LEXICON_PATH, LEXICON_GLOB)
+    @timed("lexicon.load")
     def cached_lexicon(self) -> Lexicon:
-        return Lexicon.from_path(LEXICON_PATH)
+        lexicon = Lexicon.from_path(LEXICON_PATH, self.parse_cache)
+        if self.eager:
+            self.evolver.start(lexicon.changes.values())
+        return lexicon
 
     @property
     def lexicon(self) -> Lexicon:  # todo: hack for PyCharm
         return self.cached_lexicon
 
+    @frozen
+    @timed("translate.resolve")
     def resolve_sentence(
         self, sentence: Sentence[DefaultWord]
     ) -> Sequence[ResolvedForm]:
         return [self.lexicon.resolve(form, sentence.scope) for form in sentence.words]
 
+    @frozen
     def resolve_and_evolve(self, sentence: Sentence[DefaultWord]) -> list[Evolved]:
         return self.evolver.evolve(
             self.resolve_sentence(sentence),
             changes=self.lexicon.changes_for(sentence.scope),
         )
 
+    @frozen
     def evolve_string(self, string: str) -> list[Evolved]:
         return self.resolve_and_evolve(self.parse_sentence(string))
 
+    @frozen
     def gloss_string(self, string: str) -> Sequence[tuple[Evolved, DefaultWord]]:
         sentence = self.parse_sentence(string)
         return list(zip(self.resolve_and_evolve(sentence), sentence.words))
 
+    @frozen
     def define_string(self, string: str) -> list[str]:
         sentence = self.parse_definables(string)
         return [
             self.lexicon.define(record, sentence.scope) for record in sentence.words
         ]
 
+    @frozen
     def resolve_and_evolve_all(self, strings: list[str]) -> None:
+        self.evolve_all(self.resolve_all(strings))
+
+    @frozen
+    def resolve_all(
+        self, strings: Iterable[str], *, skip_errors: bool = False
+    ) -> dict[Scope, list[ResolvedForm]]:
         per_scope_sentences: dict[Scope, list[ResolvedForm]] = {}
         for string in strings:
-            sentence = self.parse_sentence(string)
+            try:
+                sentence = self.parse_sentence(string)
+                forms = self.resolve_sentence(sentence)
+            except (PyconlangError, PyrsercombError):
+                if not skip_errors:
+                    raise
+                continue
+
             per_scope_sentences.setdefault(sentence.scope, [])
-            per_scope_sentences[sentence.scope].extend(self.resolve_sentence(sentence))
+            per_scope_sentences[sentence.scope].extend(forms)
+
+        return per_scope_sentences
 
+    @frozen
+    def evolve_all(
+        self,
+        per_scope_sentences: Mapping[Scope, Sequence[ResolvedForm]],
+        *,
+        skip_errors: bool = False,
+    ) -> None:
         for scope, forms in per_scope_sentences.items():
-            self.evolver.evolve(forms, changes=self.lexicon.changes_for(scope))
+            try:
+                self.evolver.evolve(forms, changes=self.lexicon.changes_for(scope))
+            except PyconlangError:
+                if not skip_errors:
+                    raise
 
+    @frozen
     def lookup_string(
         self, string: str
     ) -> Sequence[tuple[DefaultWord, list[tuple[Describable, str]]]]:
@@ -80,6 +133,7 @@ class Translator:
         sentence = self.parse_sentence(string)
         return [(word, lexicon.lookup(word, sentence.scope)) for word in sentence.words]
 
+    @frozen
     def trace_string(self, string: str) -> list[EvolvedWithTrace]:
         sentence = self.parse_sentence(string)
         return self.evolver.trace(
@@ -88,9 +142,11 @@ class Translator:
         )
 
     @staticmethod
+    @timed("translate.parse")
     def parse_sentence(string: str) -> DefaultSentence:
         return parse_sentence(string)
 
     @staticmethod
+    @timed("translate.parse")
     def parse_definables(string: str) -> Sentence[Definable]:
         return parse_definables(string)
@@ -1,7 +1,10 @@
 from typing import List, Optional
 
-class FileSystemEvent: ...
-class FileSystemEventHandler: ...
+class FileSystemEvent:
+    src_path: str
+
+class FileSystemEventHandler:
+    def dispatch(self, event: FileSystemEvent) -> None: ...
 
 class PatternMatchingEventHandler(FileSystemEventHandler):
     def __init__(
@@ -1,7 +1,13 @@
 from pathlib import Path
 
 from pyconlang.domain import Component, Compound, Joiner, Morpheme, Rule
-from pyconlang.evolve.arrange import AffixArranger
+from pyconlang.evolve.arrange import (
+    AffixArranger,
+    fingerprint_rules,
+    first_changed_rule,
+    removed_rules,
+)
+from pyconlang.lexurgy.includes import traverse_includes
 
 
 def test_rearrange(arranger: AffixArranger) -> None:
@@ -61,3 +67,91 @@ def test_from_path(
         "era2": 4,
         "ultra-modern": 5,
     }
+
+
+def test_traverse_includes(
+    base_changes_path: Path,
+    romanizer_path: Path,
+    archaic_changes_path: Path,
+    modern_changes_path: Path,
+) -> None:
+    assert set(traverse_includes(archaic_changes_path)) == {
+        archaic_changes_path,
+        base_changes_path,
+        romanizer_path,
+    }
+
+    assert set(traverse_includes(modern_changes_path)) == {
+        modern_changes_path,
+        archaic_changes_path,
+        base_changes_path,
+        romanizer_path,
+    }
+
+    assert traverse_includes(base_changes_path) == [base_changes_path]
+
+
+def test_fingerprint_rules(modern_changes: str, modern_changes_path: Path) -> None:
+    rules = fingerprint_rules(modern_changes_path)
+
+    assert [name for name, _fingerprint in rules] == [
+        "",
+        "syllables",
+        "romanizer-archaic-phonetic",
+        "romanizer-archaic",
+        "palatalization",
+        "era1",
+        "intervocalic-voicing",
+        "vowel-raising",
+        "era2",
+        "romanizer-modern-phonetic",
+        "romanizer-modern",
+    ]
+
+    assert first_changed_rule(rules, rules) is None
+
+    modern_changes_path.write_text(modern_changes.replace("era1:", "# comment\nera1:"))
+
+    assert first_changed_rule(rules, fingerprint_rules(modern_changes_path)) is None
+
+    modern_changes_path.write_text(modern_changes.replace("[high]", "[mid]"))
+
+    assert first_changed_rule(rules, fingerprint_rules(modern_changes_path)) == 7
+
+    modern_changes_path.write_text(
+        modern_changes.replace("era2:", "extra:\n    unchanged\nera2:")
+    )
+
+    assert first_changed_rule(rules, fingerprint_rules(modern_changes_path)) == 8
+
+
+def test_removed_rules(modern_changes: str, modern_changes_path: Path) -> None:
+    rules = fingerprint_rules(modern_changes_path)
+
+    modern_changes_path.write_text(modern_changes.replace("era2:\n    unchanged", ""))
+
+    assert removed_rules(rules, fingerprint_rules(modern_changes_path), 8) == ["era2"]
+
+    modern_changes_path.write_text(
+        modern_changes.replace(
+            "vowel-raising:", "removed:\n    a => o\n\nvowel-raising:"
+        )
+    )
+
+    assert removed_rules(fingerprint_rules(modern_changes_path), rules, 7) is None
+
+    modern_changes_path.write_text(modern_changes.replace("[high]", "[mid]"))
+
+    assert removed_rules(rules, fingerprint_rules(modern_changes_path), 7) is None
+
+    modern_changes_path.write_text(
+        modern_changes.replace("era2:", "extra:\n    unchanged\nera2:")
+    )
+
+    assert removed_rules(rules, fingerprint_rules(modern_changes_path), 8) is None
+
+    modern_changes_path.write_text(
+        modern_changes.replace("romanizer-modern:", "romanizer-other:")
+    )
+
+    assert removed_rules(rules, fingerprint_rules(modern_changes_path), 10) is None
@@ -1,11 +1,15 @@
+from collections.abc import Sequence
 from dataclasses import replace
 from pathlib import Path
 
+import pytest
+
 from pyconlang.config import config, config_as
 from pyconlang.domain import Component, Compound, Joiner, Morpheme, Rule
-from pyconlang.evolve import Evolver
+from pyconlang.evolve import MIN_SHARD_SIZE, Evolver, shard_words
 from pyconlang.evolve.domain import Evolved
-from pyconlang.lexurgy.domain import TraceLine
+from pyconlang.lexurgy import LexurgyClient
+from pyconlang.lexurgy.domain import AnyLexurgyResponse, LexurgyRequest, TraceLine
 
 
 def test_evolve_words(
@@ -187,3 +191,106 @@ def test_trace(simple_evolver: Evolver, modern_changes_path: Path) -> None:
             ],
         )
     ]
+
+
+def test_shard_words() -> None:
+    words = [str(i) for i in range(200)]
+
+    assert shard_words(words, 1) == [words]
+    assert shard_words(words[:10], 4) == [words[:10]]
+    assert shard_words(words, 3) == [words[:67], words[67:134], words[134:]]
+    assert sum(shard_words(words, 16), []) == words
+
+
+def test_evolve_words_sharded(
+    simple_evolver: Evolver, modern_changes_path: Path
+) -> None:
+    simple_evolver.lexurgy(modern_changes_path).size = 2
+    words = ["apaki", "apakí"] * MIN_SHARD_SIZE
+
+    evolved, _ = simple_evolver.evolve_words(words, changes=modern_changes_path)
+
+    assert (
+        evolved
+        == [
+            Evolved("apaki", "abashi", "abaʃi"),
+            Evolved("apakí", "abashí", "abaʃí"),
+        ]
+        * MIN_SHARD_SIZE
+    )
+
+
+def test_incremental_evolve(
+    simple_evolver: Evolver,
+    modern_changes: str,
+    modern_changes_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    with config_as(replace(config(), incremental_evolve=True)):
+        assert simple_evolver.evolve(
+            [Component(Morpheme("apaki")), Component(Morpheme("apaki", Rule("era2")))],
+            changes=modern_changes_path,
+        ) == [Evolved("apaki", "abashi", "abaʃi"), Evolved("apaki", "apaki", "apaki")]
+
+        modern_changes_path.write_text(
+            modern_changes.replace(
+                "era2:",
+                "post-alveolars-front:\n    ʃ => s\n\nera2:",
+            )
+        )
+
+        requests = record_requests(monkeypatch)
+
+        assert simple_evolver.evolve(
+            [Component(Morpheme("apaki")), Component(Morpheme("apaki", Rule("era2")))],
+            changes=modern_changes_path,
+        ) == [Evolved("apaki", "abasi", "abasi"), Evolved("apaki", "apaki", "apaki")]
+
+    assert sorted(str(request.start_at) for request in requests) == [
+        "era2",
+        "post-alveolars-front",
+    ]
+
+
+def test_incremental_evolve_removed_rule(
+    simple_evolver: Evolver,
+    modern_changes: str,
+    modern_changes_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    modern_changes_path.write_text(
+        modern_changes.replace(
+            "romanizer-modern-phonetic:",
+            "final:\n    a => o\n\nromanizer-modern-phonetic:",
+        )
+    )
+
+    with config_as(replace(config(), incremental_evolve=True)):
+        assert simple_evolver.evolve(
+            [Component(Morpheme("apaki")), Component(Morpheme("iki"))],
+            changes=modern_changes_path,
+        ) == [Evolved("apaki", "obashi", "obaʃi"), Evolved("iki", "ishi", "iʃi")]
+
+        modern_changes_path.write_text(modern_changes)
+        requests = record_requests(monkeypatch)
+
+        assert simple_evolver.evolve(
+            [Component(Morpheme("apaki")), Component(Morpheme("iki"))],
+            changes=modern_changes_path,
+        ) == [Evolved("apaki", "abashi", "abaʃi"), Evolved("iki", "ishi", "iʃi")]
+
+    assert [word for request in requests for word in request.words] == ["apaki"]
+
+
+def record_requests(monkeypatch: pytest.MonkeyPatch) -> list[LexurgyRequest]:
+    requests: list[LexurgyRequest] = []
+    roundtrip_all = LexurgyClient.roundtrip_all
+
+    def recording(
+        self: LexurgyClient, batch: Sequence[LexurgyRequest]
+    ) -> list[AnyLexurgyResponse]:
+        requests.extend(batch)
+        return roundtrip_all(self, batch)
+
+    monkeypatch.setattr(LexurgyClient, "roundtrip_all", recording)
+    return requests
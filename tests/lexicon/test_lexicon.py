@@ -2,6 +2,7 @@ from pathlib import Path
 
 import pytest
 
+from pyconlang import LEXICON_PATH
 from pyconlang.config import Config, config_as
 from pyconlang.domain import (
     Component,
@@ -12,14 +13,16 @@ from pyconlang.domain import (
     Lexeme,
     Morpheme,
     Prefix,
+    ResolvedForm,
     Rule,
     Scope,
     Scoped,
     Suffix,
 )
-from pyconlang.lexicon import Lexicon
+from pyconlang.lexicon import Lexicon, ParseCache
 from pyconlang.lexicon.domain import TemplateName, VarFusion
-from pyconlang.lexicon.errors import MissingLexeme
+from pyconlang.lexicon.errors import MissingLexeme, MissingTemplate
+from pyconlang.translate import Translator
 
 from .. import default_compound
 
@@ -202,6 +205,42 @@ def test_resolve_fusions(root_config: Config, parsed_lexicon: Lexicon) -> None:
     ) == Compound(Component(Morpheme("mo")), Joiner.tail(), Component(Morpheme("ta")))
 
 
+def test_resolve_memoized(
+    simple_pyconlang: Path, sample_lexicon: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    resolutions = {"val": 0}
+    resolve_fusion_uncached = Lexicon.resolve_fusion_uncached
+
+    def counting_resolve(
+        lexicon: Lexicon, fusion: DefaultFusion, scope: Scope
+    ) -> ResolvedForm:
+        resolutions["val"] += 1
+        return resolve_fusion_uncached(lexicon, fusion, scope)
+
+    monkeypatch.setattr(Lexicon, "resolve_fusion_uncached", counting_resolve)
+
+    word = Component(
+        DefaultFusion(Lexeme("gravel").with_scope(), (Scoped(Prefix("STONE")),), ())
+    )
+
+    with Translator.new() as translator:
+        resolved = translator.lexicon.resolve(word)
+        resolved_count = resolutions["val"]
+
+        assert resolved_count > 0
+        assert translator.lexicon.resolve(word) == resolved
+        assert resolutions["val"] == resolved_count
+
+        (simple_pyconlang / LEXICON_PATH).write_text(
+            sample_lexicon.replace(
+                "entry <gravel> <stone>.PL", "entry <gravel> <stone>.COL"
+            )
+        )
+
+        assert translator.lexicon.resolve(word) != resolved
+        assert resolutions["val"] > resolved_count
+
+
 def test_templates(root_config: Config, parsed_lexicon: Lexicon) -> None:
     assert parsed_lexicon.get_vars(None) == (VarFusion("$", (), ()),)
 
@@ -210,6 +249,18 @@ def test_templates(root_config: Config, parsed_lexicon: Lexicon) -> None:
         VarFusion("$", (), (Scoped(Suffix("PL")),)),
     )
 
+    assert parsed_lexicon.get_vars(TemplateName("plural"), Scope("modern")) == (
+        parsed_lexicon.get_vars(TemplateName("plural"))
+    )
+
+    assert parsed_lexicon.get_var_forms(TemplateName("plural")) == (
+        ("", ""),
+        ("", ".PL"),
+    )
+
+    with pytest.raises(MissingTemplate):
+        parsed_lexicon.get_vars(TemplateName("nonexistent"))
+
 
 def test_define(root_config: Config, parsed_lexicon: Lexicon) -> None:
     assert parsed_lexicon.define(Scoped(Suffix("PL"))) == "plural for inanimate"
@@ -308,6 +359,29 @@ def test_scopes(root_config: Config, parsed_lexicon: Lexicon) -> None:
     )
 
 
+def test_inherited_entries(root_config: Config, parsed_lexicon: Lexicon) -> None:
+    assert parsed_lexicon.scope_chain(Scope("ultra-modern")) == [
+        Scope("ultra-modern"),
+        Scope("modern"),
+        Scope(),
+    ]
+
+    assert parsed_lexicon.get_entry(
+        Lexeme("stone"), Scope("ultra-modern")
+    ) == parsed_lexicon.get_entry(Lexeme("stone"), Scope("modern"))
+
+    assert parsed_lexicon.get_entry(
+        Lexeme("gravel"), Scope("ultra-modern")
+    ) != parsed_lexicon.get_entry(Lexeme("gravel"))
+
+    assert parsed_lexicon.get_affix(
+        Suffix("PL"), Scope("ultra-modern")
+    ) == parsed_lexicon.get_affix(Suffix("PL"))
+
+    with pytest.raises(MissingLexeme):
+        parsed_lexicon.get_entry(Lexeme("nonexistent"), Scope("ultra-modern"))
+
+
 def test_default_scope(
     root_config: Config, modern_config: Config, sample_lexicon: str
 ) -> None:
@@ -355,3 +429,30 @@ def test_scope_from_filename(
     )
     with pytest.raises(MissingLexeme):
         modern_lexicon.get_entry(Lexeme("pile"), root_scope)
+
+
+def test_parse_cache(
+    cd_tmp_path: Path, sample_lexicon: str, parsed_lexicon: Lexicon
+) -> None:
+    main = cd_tmp_path / "main.pycl"
+    included = cd_tmp_path / "%modern.pycl"
+    main.write_text('include "%modern.pycl"\n' + sample_lexicon)
+    included.write_text("entry <pile> *pila (n.) pile")
+
+    cache: ParseCache = {}
+    lexicon = Lexicon.from_path(main, cache)
+
+    assert len(cache) == 2
+    assert lexicon.get_entry(Lexeme("pile"), Scope("modern")).tags.scope == Scope(
+        "modern"
+    )
+    assert len(lexicon.entries) == len(parsed_lexicon.entries) + 1
+
+    parsed_main = next(lines for lines in cache.values() if len(lines) > 1)
+    pile = lexicon.get_entry(Lexeme("pile"), Scope("modern"))
+    included.write_text("entry <pile> *pilo (n.) pile")
+    lexicon = Lexicon.from_path(main, cache)
+
+    assert len(cache) == 2
+    assert any(lines is parsed_main for lines in cache.values())
+    assert lexicon.get_entry(Lexeme("pile"), Scope("modern")).form != pile.form
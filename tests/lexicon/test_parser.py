@@ -36,6 +36,7 @@ from pyconlang.lexicon.parser import (
     include,
     lexical_sources,
     lexicon_line,
+    parse_lexicon_line,
     part_of_speech,
     quoted_string,
     scope_definition,
@@ -266,6 +267,27 @@ def test_errors() -> None:
     assert e.value.expected == ">"
 
 
+def test_parse_lexicon_line() -> None:
+    for line in [
+        "scope %ultra-modern : %modern 'changes/ultra-modern.lsc'",
+        "template &name $ # comment",
+        "affix ! .PL @era *proto (<big> <pile>) plural for inanimate",
+        "entry &plural <strong> *kipu@era1.PL (adj.) strong, stable",
+        "include 'a/relative/path'",
+        " \t # and a comment",
+        "",
+    ]:
+        assert parse_lexicon_line(line) == parse(lexicon_line, line)
+
+    with pytest.raises(PyrsercombError) as e:
+        parse_lexicon_line("entry <bla *ka")
+
+    assert e.value.index == 14
+
+    with pytest.raises(PyrsercombError):
+        parse_lexicon_line("lang bla")
+
+
 def test_lexicon(parsed_lexicon: Lexicon) -> None:
     assert isinstance(parsed_lexicon, Lexicon)
 
@@ -0,0 +1,118 @@
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+
+import pytest
+
+from pyconlang.lexurgy.coalesce import Coalescer, Pending
+from pyconlang.lexurgy.domain import (
+    AnyLexurgyResponse,
+    LexurgyErrorResponse,
+    LexurgyRequest,
+    LexurgyResponse,
+)
+
+
+def test_coalesce() -> None:
+    sent: list[list[LexurgyRequest]] = []
+    first = Event()
+    release = Event()
+
+    def send(requests: Sequence[LexurgyRequest]) -> list[AnyLexurgyResponse]:
+        sent.append(list(requests))
+        if len(sent) == 1:
+            first.set()
+            release.wait(5)
+
+        return [
+            LexurgyErrorResponse("bad", [])
+            if "bad" in request.words
+            else LexurgyResponse(
+                [word.upper() for word in request.words],
+                {"modern": [f"{word}!" for word in request.words]},
+            )
+            for request in requests
+        ]
+
+    coalescer = Coalescer(send)
+
+    with ThreadPoolExecutor(4) as executor:
+        blocking = executor.submit(
+            coalescer.roundtrip_all, [LexurgyRequest(["x"], "a")]
+        )
+        first.wait(5)
+
+        results = [
+            executor.submit(coalescer.roundtrip_all, requests)
+            for requests in [
+                [LexurgyRequest(["a", "b"], "a"), LexurgyRequest(["c"], "b")],
+                [LexurgyRequest(["d"], "a"), LexurgyRequest(["e"], "a")],
+                [LexurgyRequest(["bad"], "a")],
+            ]
+        ]
+        while sum(map(len, coalescer.pending.values())) < 5:
+            sleep(0.01)
+        release.set()
+
+        assert blocking.result() == [LexurgyResponse(["X"], {"modern": ["x!"]})]
+        assert results[0].result() == [
+            LexurgyResponse(["A", "B"], {"modern": ["a!", "b!"]}),
+            LexurgyResponse(["C"], {"modern": ["c!"]}),
+        ]
+        assert results[1].result() == [
+            LexurgyResponse(["D"], {"modern": ["d!"]}),
+            LexurgyResponse(["E"], {"modern": ["e!"]}),
+        ]
+        assert results[2].result() == [LexurgyErrorResponse("bad", [])]
+
+    assert [len(requests) for requests in sent[:2]] == [1, 3]
+    assert sorted(request.words for request in sent[1]) == [
+        ["a", "b", "d", "bad"],
+        ["c"],
+        ["e"],
+    ]
+
+
+def test_coalesce_failures() -> None:
+    sent: list[list[LexurgyRequest]] = []
+
+    def send(requests: Sequence[LexurgyRequest]) -> list[AnyLexurgyResponse]:
+        sent.append(list(requests))
+        if len(sent) == 1:
+            raise SystemExit()
+        if len(sent) == 3:
+            raise ValueError("resend")
+
+        return [
+            LexurgyErrorResponse("bad", [])
+            if "bad" in request.words
+            else LexurgyResponse([word.upper() for word in request.words], {})
+            for request in requests
+        ]
+
+    coalescer = Coalescer(send)
+
+    interrupted = Pending(LexurgyRequest(["a"]))
+    coalescer.pending = {(None, None, True, 0): [interrupted]}
+    coalescer.flushing = True
+
+    with pytest.raises(SystemExit):
+        coalescer.flush_all()
+
+    assert not coalescer.flushing
+    with pytest.raises(SystemExit):
+        interrupted.future.result()
+
+    bad = [Pending(LexurgyRequest(["bad"])), Pending(LexurgyRequest(["b"]))]
+    good = [Pending(LexurgyRequest(["c"], "a"))]
+    coalescer.flush([bad, good])
+
+    assert good[0].future.result() == LexurgyResponse(["C"], {})
+    for pending in bad:
+        with pytest.raises(ValueError):
+            pending.future.result()
+
+    assert coalescer.roundtrip_all([LexurgyRequest(["d"])]) == [
+        LexurgyResponse(["D"], {})
+    ]
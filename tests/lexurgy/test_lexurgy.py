@@ -1,7 +1,18 @@
+from dataclasses import replace
 from inspect import cleandoc
 from pathlib import Path
+from subprocess import Popen
+from unittest.mock import ANY
 
-from pyconlang.lexurgy import LexurgyClient
+import pytest
+
+from pyconlang.config import config, config_as
+from pyconlang.lexurgy import (
+    LexurgyClient,
+    LexurgyProcesses,
+    LexurgyServer,
+    lexurgy_processes,
+)
 from pyconlang.lexurgy.domain import LexurgyRequest, LexurgyResponse
 
 
@@ -43,3 +54,137 @@ def test_roundtrip(
             "modern": ["isi"],
         },
     )
+
+
+def test_roundtrip_all(modern_changes_path: Path) -> None:
+    client = LexurgyClient(modern_changes_path, 2)
+
+    assert client.roundtrip_all(
+        [LexurgyRequest(["iki"]), LexurgyRequest(["apaki"]), LexurgyRequest(["ma"])]
+    ) == [
+        LexurgyResponse(["iʃi"], ANY),
+        LexurgyResponse(["abaʃi"], ANY),
+        LexurgyResponse(["ma"], ANY),
+    ]
+    assert 1 <= len(client.servers) <= 2
+
+
+def test_pipeline(modern_changes_path: Path) -> None:
+    server = LexurgyServer(modern_changes_path)
+
+    assert server.pipeline(
+        [LexurgyRequest(["iki"]), LexurgyRequest(["apaki"], start_at="era1")]
+    ) == [
+        LexurgyResponse(["iʃi"], ANY),
+        LexurgyResponse(["abagi"], ANY),
+    ]
+
+
+def test_pipeline_failure(
+    modern_changes_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    server = LexurgyServer(modern_changes_path)
+    requests = [LexurgyRequest(["iki"]), LexurgyRequest(["apaki"])]
+
+    def broken_send(popen: Popen[str], request: LexurgyRequest) -> None:
+        raise BrokenPipeError()
+
+    def broken_receive(popen: Popen[str]) -> LexurgyResponse:
+        raise ValueError()
+
+    popen = server.popen
+    with monkeypatch.context() as patch:
+        patch.setattr(LexurgyServer, "send", staticmethod(broken_send))
+        with pytest.raises(BrokenPipeError):
+            server.pipeline(requests)
+
+    assert popen.wait(10) is not None
+
+    popen = server.popen
+    with monkeypatch.context() as patch:
+        patch.setattr(LexurgyServer, "receive", staticmethod(broken_receive))
+        with pytest.raises(ValueError):
+            server.pipeline(requests)
+
+    assert popen.wait(10) is not None
+
+    assert server.pipeline(requests) == [
+        LexurgyResponse(["iʃi"], ANY),
+        LexurgyResponse(["abaʃi"], ANY),
+    ]
+
+
+def test_start(modern_changes_path: Path) -> None:
+    client = LexurgyClient(modern_changes_path, 2)
+    client.start()
+
+    assert len(client.servers) == 1
+    assert client.servers[0].popen.poll() is None
+    assert client.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
+    assert len(client.servers) == 1
+
+
+def test_retire(modern_changes: str, modern_changes_path: Path) -> None:
+    server = LexurgyServer(modern_changes_path)
+
+    assert server.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
+    popen = server.popen
+
+    modern_changes_path.write_text(
+        modern_changes.replace("era2:", "era3:\n    unchanged\n\nera2:")
+    )
+
+    assert server.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
+    assert server.popen is not popen
+    assert popen.wait(10) is not None
+    assert lexurgy_processes().live() >= 1
+
+
+def test_stop_if_idle(modern_changes_path: Path) -> None:
+    server = LexurgyServer(modern_changes_path)
+
+    assert server.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
+    popen = server.popen
+
+    server.stop_if_idle(60)
+
+    assert server.popen is popen
+
+    server.stop_if_idle(0)
+
+    assert popen.wait(10) is not None
+    assert server.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
+    assert server.popen is not popen
+
+
+def test_reaper_needs_timeout(modern_changes_path: Path) -> None:
+    processes = LexurgyProcesses()
+
+    processes.stop(processes.spawn(modern_changes_path))
+
+    assert processes.reaper is None
+
+    with config_as(replace(config(), lexurgy_idle_timeout=60)):
+        processes.stop(processes.spawn(modern_changes_path))
+
+    assert processes.reaper is not None and processes.reaper.is_alive()
+
+
+def test_server_watches_its_includes(
+    archaic_changes: str,
+    archaic_changes_path: Path,
+    modern_changes_path: Path,
+    ultra_modern_changes: str,
+    ultra_modern_changes_path: Path,
+) -> None:
+    server = LexurgyServer(modern_changes_path)
+    popen = server.popen
+
+    ultra_modern_changes_path.write_text(f"{ultra_modern_changes}\n# comment")
+
+    assert server.popen is popen
+
+    archaic_changes_path.write_text(f"{archaic_changes}\n# comment")
+
+    assert server.popen is not popen
+    assert server.roundtrip(LexurgyRequest(["iki"])) == LexurgyResponse(["iʃi"], ANY)
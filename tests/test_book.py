@@ -4,7 +4,11 @@ from pathlib import Path
 import pytest
 from pyrsercomb import PyrsercombError
 
-from pyconlang.book import OUT_PATH, compile_book
+from pyconlang.book import OUT_PATH, Compiler, compile_book
+from pyconlang.book.conlang import evolve_payloads
+from pyconlang.domain import DefaultSentence
+from pyconlang.profile import profiling
+from pyconlang.translate import Translator
 
 
 def test_table(simple_pyconlang: Path) -> None:
@@ -342,6 +346,120 @@ def test_assets(simple_pyconlang: Path) -> None:
     assert (OUT_PATH / "test.txt").read_text() == "bla\n"
 
 
+def test_incremental_compile(simple_pyconlang: Path) -> None:
+    write(simple_pyconlang / "src/other.out.md", "other")
+
+    index = OUT_PATH / "index.html"
+    other = OUT_PATH / "other.html"
+
+    with Compiler.new() as compiler:
+        compiler.compile()
+        compiled = index.stat().st_mtime_ns
+
+        write(simple_pyconlang / "src/other.out.md", "changed")
+        compiler.compile()
+
+        assert index.stat().st_mtime_ns == compiled
+        assert "changed" in other.read_text()
+
+        write(simple_pyconlang / "src/grammar.md", "included change")
+        compiler.compile()
+
+        assert "included change" in index.read_text()
+
+        (simple_pyconlang / "src/other.out.md").unlink()
+        compiler.compile()
+
+        assert not other.exists()
+
+
+def test_incremental_compile_deleted(simple_pyconlang: Path) -> None:
+    write(simple_pyconlang / "src/other.out.md", "other")
+    write(simple_pyconlang / "src/other.pycl", "")
+
+    with Compiler.new() as compiler:
+        compiler.compile()
+
+        (simple_pyconlang / "src/grammar.md").unlink()
+        with profiling() as stats:
+            compiler.compile()
+
+        assert stats.counters["book.stale-pages"] == 1
+
+        (simple_pyconlang / "src/other.pycl").unlink()
+        with profiling() as stats:
+            compiler.compile()
+
+        assert stats.counters["book.stale-pages"] == 2
+
+
+def test_parallel_compile(simple_pyconlang: Path) -> None:
+    write(simple_pyconlang / "src/other.out.md", "r(<stone>)")
+
+    compile_book(jobs=2)
+
+    assert "TestLang" in (OUT_PATH / "index.html").read_text()
+    assert "kaba" in (OUT_PATH / "other.html").read_text()
+
+
+def test_parallel_compile_spawns_no_lexurgy(simple_pyconlang: Path) -> None:
+    write(simple_pyconlang / "src/other.out.md", "r(<stone>)")
+
+    with Compiler.new(2, eager=True) as compiler:
+        compiler.compile()
+
+        write(simple_pyconlang / "src/grammar.md", "included change")
+        write(simple_pyconlang / "src/other.out.md", "r(<stone>) changed")
+
+        with profiling() as stats:
+            compiler.compile()
+
+    assert stats.counters["book.stale-pages"] == 2
+    assert stats.counters["lexurgy.spawned"] == 0
+    assert "kaba" in (OUT_PATH / "other.html").read_text()
+
+
+def test_evolve_payloads() -> None:
+    assert evolve_payloads(
+        "r(<stone>) and >ph[ *kika ] d(<gravel>)\npr[<pebble>] ph<[%modern <big>]"
+    ) == {"<stone>", "*kika", "%modern <big>"}
+
+
+def test_prefetch_dictionary(simple_pyconlang: Path) -> None:
+    index = simple_pyconlang / "src/index.out.md"
+
+    with Compiler.new() as compiler:
+        with profiling() as stats:
+            compiler.prefetch([index])
+
+        assert stats.counters["lexurgy.requests"] > 0
+
+        with profiling() as stats:
+            compiler.compile_file(index)
+
+        assert "lexurgy.requests" not in stats.counters
+
+    assert "<strong>kabaigi</strong> [kabaigi]" in (OUT_PATH / "index.html").read_text()
+
+
+def test_prefetch_errors(
+    simple_pyconlang: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    page = simple_pyconlang / "src/other.out.md"
+    write(page, "r(<nothing>) r(<) r(<stone>)")
+
+    with Compiler.new() as compiler:
+        compiler.prefetch([page])
+
+        def broken(self: Translator, sentence: DefaultSentence) -> None:
+            raise TypeError()
+
+        monkeypatch.setattr(Translator, "resolve_sentence", broken)
+
+        with pytest.raises(TypeError):
+            compiler.prefetch([page])
+
+
 def write(path: Path, text: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(cleandoc(text) + "\n")
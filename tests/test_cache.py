@@ -1,10 +1,23 @@
+import gc
+import sqlite3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from multiprocessing import Process, Value
 from pathlib import Path
+from threading import Thread
 from typing import Protocol, cast
 
+import pytest
+
 from pyconlang.cache import (
+    AnyPath,
+    CacheStats,
+    FileMonitor,
     PersistentDict,
+    cache_registry,
+    file_monitor,
+    frozen,
     path_cache,
     path_cached_method,
     path_cached_property,
@@ -74,6 +87,116 @@ def test_path_cached_func(cd_tmp_path: Path) -> None:
     assert example(1) == 4
     assert example(2) == 6
 
+    path_b.unlink()
+
+    assert example(1) == 7
+
+    path_a.unlink()
+
+    assert example(1) == 8
+
+
+def test_file_monitor_frozen(cd_tmp_path: Path) -> None:
+    path_a = cd_tmp_path / "a.md"
+    path_a.write_text("hello")
+
+    counter = {"val": 0}
+
+    @path_cache("*.txt", path_a)
+    def example() -> int:
+        counter["val"] += 1
+        return counter["val"]
+
+    assert example() == 1
+
+    with file_monitor().frozen():
+        path_a.write_text("goodbye")
+        (cd_tmp_path / "b.txt").write_text("hi")
+
+        assert example() == 1
+
+    assert example() == 2
+
+    generation = file_monitor().current([path_a])
+
+    assert file_monitor().current([path_a]) == generation
+
+    path_a.write_text("hello again")
+
+    assert file_monitor().current([path_a]) > generation
+
+
+def test_frozen(tmp_pyconlang: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+
+    sweeps = {"val": 0}
+    sweep = FileMonitor.sweep
+
+    def counting_sweep(monitor: FileMonitor) -> None:
+        sweeps["val"] += 1
+        sweep(monitor)
+
+    monkeypatch.setattr(FileMonitor, "sweep", counting_sweep)
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        my_dict["hello"] = 1
+
+        @frozen
+        def lookup() -> int:
+            return sum(my_dict["hello"] for _ in range(100))
+
+        sweeps["val"] = 0
+
+        assert lookup() == 100
+        assert sweeps["val"] == 1
+
+        def lookup_one(_i: int) -> int:
+            return my_dict["hello"]
+
+        @frozen
+        def lookup_in_threads() -> int:
+            with ThreadPoolExecutor(4) as executor:
+                return sum(executor.map(file_monitor().share(lookup_one), range(100)))
+
+        sweeps["val"] = 0
+
+        assert lookup_in_threads() == 100
+        assert sweeps["val"] == 1
+
+
+def test_file_monitor_observing(cd_tmp_path: Path) -> None:
+    path_a = cd_tmp_path / "a.md"
+    path_a.write_text("hello")
+    path_b = cd_tmp_path / "b.txt"
+
+    counter = {"val": 0}
+
+    @path_cache("*.txt", path_a)
+    def example() -> int:
+        counter["val"] += 1
+        return counter["val"]
+
+    assert example() == 1
+
+    with file_monitor().observing(cd_tmp_path):
+        path_a.write_text("goodbye")
+
+        assert example() == 1
+
+        file_monitor().notify([path_a])
+
+        assert example() == 2
+
+        path_b.write_text("hi")
+        file_monitor().notify([str(path_b)])
+
+        assert example() == 3
+
+    path_a.write_text("hello again")
+
+    assert example() == 4
+
 
 def test_path_cached_method(cd_tmp_path: Path) -> None:
     path_a = cd_tmp_path / "a.md"
@@ -113,6 +236,75 @@ def test_path_cached_method(cd_tmp_path: Path) -> None:
     assert bar.example(2) == 11
 
 
+def test_path_cache_max_size(cd_tmp_path: Path) -> None:
+    path_a = cd_tmp_path / "a.md"
+    path_a.write_text("hello")
+
+    calls: list[int] = []
+
+    @path_cache(path_a, max_size=2)
+    def example(x: int) -> int:
+        calls.append(x)
+        return x
+
+    example(1)
+    example(2)
+    example(1)
+    example(3)
+    example(1)
+    example(2)
+
+    assert calls == [1, 2, 3, 2]
+    assert example.stats().evictions == 2
+    assert example.stats().entries == 2
+
+
+def test_path_cache_dispose(cd_tmp_path: Path) -> None:
+    path_a = cd_tmp_path / "a.md"
+    path_a.write_text("hello")
+
+    disposed: list[int] = []
+
+    @path_cache(path_a, max_size=2, dispose=disposed.append)
+    def example(x: int) -> int:
+        return x
+
+    example(1)
+    example(2)
+    example(3)
+
+    assert disposed == [1]
+
+    path_a.write_text("goodbye")
+    example(3)
+
+    assert disposed == [1, 2, 3]
+
+
+def test_path_cached_method_releases_instances(cd_tmp_path: Path) -> None:
+    path_a = cd_tmp_path / "a.md"
+    path_a.write_text("hello")
+
+    @dataclass
+    class Foo:
+        value: int
+
+        @path_cached_method(path_a)
+        def example(self) -> int:
+            return self.value
+
+    foo = Foo(1)
+    reference = weakref.ref(foo)
+
+    assert foo.example() == 1
+
+    del foo
+    gc.collect()
+
+    assert reference() is None
+    assert Foo(2).example() == 2
+
+
 class SettableInt(Protocol):
     value: int
 
@@ -182,3 +374,129 @@ def test_persistent_dict(tmp_pyconlang: Path) -> None:
 
     assert v.value == 1
     v.value = 0
+
+
+def test_persistent_dict_incremental(tmp_pyconlang: Path) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        my_dict["hello"] = 1
+        my_dict["goodbye"] = 2
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        assert my_dict["hello"] == 1
+        my_dict["ciao"] = 3
+        del my_dict["goodbye"]
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        assert "goodbye" not in my_dict
+        assert dict(my_dict) == {"hello": 1, "ciao": 3}
+        assert len(my_dict) == 2
+
+    a.write_text("hi")
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        assert len(my_dict) == 0
+
+
+def test_persistent_dict_close(tmp_pyconlang: Path) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        my_dict["hello"] = 1
+        connection = my_dict.connection
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+
+    my_dict["goodbye"] = 2
+    my_dict.close()
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        assert dict(my_dict) == {"hello": 1, "goodbye": 2}
+
+
+def test_persistent_dict_partitions(tmp_pyconlang: Path) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+    b = tmp_pyconlang / "b.txt"
+    b.write_text("hello")
+
+    def partition(key: tuple[str, str]) -> str:
+        return key[0]
+
+    def partition_paths(name: str) -> list[AnyPath]:
+        return [tmp_pyconlang / f"{name}.txt"]
+
+    def new_dict() -> PersistentDict[tuple[str, str], int]:
+        return PersistentDict("cache", [], partition, partition_paths)
+
+    with new_dict() as my_dict:
+        my_dict[("a", "hello")] = 1
+        my_dict[("b", "hello")] = 2
+
+    b.write_text("hi")
+
+    with new_dict() as my_dict:
+        assert my_dict[("a", "hello")] == 1
+        assert ("b", "hello") not in my_dict
+        my_dict[("b", "hi")] = 3
+
+    with new_dict() as my_dict:
+        assert dict(my_dict) == {("a", "hello"): 1, ("b", "hi"): 3}
+
+
+def test_persistent_dict_concurrent_flush(tmp_pyconlang: Path) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+
+        def write(offset: int) -> None:
+            for i in range(offset, offset + 500):
+                my_dict[str(i)] = i
+
+        writers = [Thread(target=write, args=(i * 500,)) for i in range(4)]
+        for writer in writers:
+            writer.start()
+        while any(writer.is_alive() for writer in writers):
+            my_dict.stats()
+        for writer in writers:
+            writer.join()
+
+    with cast(PersistentDict[str, int], PersistentDict("cache", [a])) as my_dict:
+        assert len(my_dict) == 2000
+
+
+def test_cache_stats(tmp_pyconlang: Path) -> None:
+    a = tmp_pyconlang / "a.txt"
+    a.write_text("hello")
+
+    @path_cache(a)
+    def double(x: int) -> int:
+        return 2 * x
+
+    double(1)
+    double(1)
+    double(2)
+    a.write_text("hi")
+    double(1)
+
+    assert double.stats() == CacheStats(1, 3, 1, 1, None)
+
+    with cast(PersistentDict[str, int], PersistentDict("stats", [a])) as my_dict:
+        my_dict["hello"] = 1
+        assert "hello" in my_dict
+        assert "goodbye" not in my_dict
+
+        stats = my_dict.stats()
+        assert (stats.hits, stats.misses, stats.invalidations) == (1, 1, 0)
+        assert stats.entries == 1
+        assert stats.size is not None and stats.size > 0
+
+        registered = cache_registry().stats()
+        assert registered["stats"] == stats
+        assert registered[double.name].misses == 3
+        assert "stats" in cache_registry().report()
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pyconlang.checksum import FINGERPRINT_ATTR, fingerprint
+from pyconlang.domain import Component, Compound, Joiner, Morpheme, Rule, Scope
+
+
+def test_fingerprint() -> None:
+    form = Compound(
+        Component(Morpheme("apak")), Joiner.head(Rule("era1")), Component(Morpheme("i"))
+    )
+    same = Compound(
+        Component(Morpheme("apak")), Joiner.head(Rule("era1")), Component(Morpheme("i"))
+    )
+    other = Compound(
+        Component(Morpheme("apak")), Joiner.tail(Rule("era1")), Component(Morpheme("i"))
+    )
+
+    assert fingerprint(form) == fingerprint(same)
+    assert fingerprint(form) != fingerprint(other)
+    assert form.__dict__[FINGERPRINT_ATTR] == fingerprint(form)
+
+    assert fingerprint(Scope("")) != fingerprint(Rule(""))
+    assert fingerprint(Morpheme("a")) != fingerprint(Morpheme("a", Rule("b")))
+    assert fingerprint(frozenset({1, 2})) == fingerprint(frozenset({2, 1}))
+    assert fingerprint((Path("a"), "b")) != fingerprint((Path("a"), Path("b")))
+    assert fingerprint(("ab", "c")) != fingerprint(("a", "bc"))
+
+    with pytest.raises(TypeError):
+        fingerprint(object())
+
+
+def test_fingerprint_is_stable() -> None:
+    code = (
+        "from pyconlang.checksum import fingerprint;"
+        "from pyconlang.domain import Morpheme, Rule;"
+        "print(fingerprint(Morpheme('apak', Rule('era1'))).hex())"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    assert output == fingerprint(Morpheme("apak", Rule("era1"))).hex()
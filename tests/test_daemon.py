@@ -0,0 +1,33 @@
+from pathlib import Path
+from threading import Thread
+from time import sleep
+
+from pyconlang.daemon import forward, running, serve, stop
+from pyconlang.repl import Mode
+
+
+def test_daemon(simple_pyconlang: Path) -> None:
+    assert forward("<big>") is None
+
+    thread = Thread(target=serve)
+    thread.start()
+    try:
+        for _ in range(100):
+            if running():
+                break
+            sleep(0.1)
+
+        assert forward("<big>") == "ishi [iʃi]"
+        assert forward("% <stone>") == "apak [apak]"
+        assert forward("%modern <stone>", Mode.TRACE) == (
+            "kapa\nkapa => kaba (intervocalic-voicing)"
+        )
+
+        output = forward("<nothing>")
+        assert output is not None and output.startswith("MissingLexeme")
+    finally:
+        stop()
+        thread.join()
+
+    assert not running()
+    assert forward("<big>") is None
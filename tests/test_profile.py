@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+from pyconlang.profile import Profile, count, profiling, timed, timer
+
+
+def test_profiling() -> None:
+    @timed("outer")
+    def outer(depth: int) -> int:
+        with timer("inner"):
+            count("calls")
+            if depth > 0:
+                return outer(depth - 1) + 1
+        return 0
+
+    outer(3)
+
+    with profiling() as profile:
+        assert outer(3) == 3
+
+    stages = profile.to_dict()["stages"]
+
+    assert stages["outer"]["calls"] == 1
+    assert stages["inner"]["calls"] == 1
+    assert stages["outer"]["seconds"] >= stages["inner"]["seconds"]
+    assert stages["outer"]["own_seconds"] <= stages["outer"]["seconds"]
+    assert profile.counters["calls"] == 4
+
+    outer(3)
+
+    assert profile.counters["calls"] == 4
+
+    with profiling() as profile:
+        pass
+
+    assert profile.to_dict() == {"stages": {}, "counters": {}}
+
+
+def test_profile_merge(tmp_path: Path) -> None:
+    profile = Profile(enabled=True)
+    with profile.timer("stage"):
+        profile.count("counter", 2)
+
+    other = Profile()
+    other.merge(profile.to_dict())
+    other.merge(profile.to_dict())
+
+    assert other.stages["stage"].calls == 2
+    assert other.counters["counter"] == 4
+    assert "stage" in other.report()
+    assert "counter" in other.report()
+
+    other.save(tmp_path / "profile.json")
+
+    merged = Profile()
+    merged.merge(json.loads((tmp_path / "profile.json").read_text()))
+
+    assert merged.to_dict() == other.to_dict()
@@ -115,6 +115,23 @@ def test_trace(simple_repl: ReplSession) -> None:
     )
 
 
+def test_stats(simple_repl: ReplSession) -> None:
+    simple_repl.run_line("<big>")
+
+    stats = simple_repl.run_line(":stats")
+
+    assert stats.splitlines()[0].split() == [
+        "cache",
+        "hits",
+        "misses",
+        "invalid",
+        "evicted",
+        "entries",
+        "size",
+    ]
+    assert "evolve-cache" in stats
+
+
 def test_repl_interactive(
     capsys: CaptureFixture[str], mock_input: PipeInput, simple_pyconlang: Path
 ) -> None: